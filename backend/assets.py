@@ -0,0 +1,235 @@
+import gzip
+import hashlib
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+try:  # Brotli is optional; without it assets are offered gzipped only
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Static asset pipeline for frontend/. At startup every JS and CSS file is
+# minified, fingerprinted with a hash of its content and compressed once with
+# gzip and brotli. /static/ then serves those bytes from memory: fingerprinted
+# URLs are cached by browsers forever, plain names are revalidated by ETag.
+# Pages reference the fingerprinted URLs through rewrite_html().
+FRONTEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "frontend"))
+IMMUTABLE = "public, max-age=31536000, immutable"
+MIN_COMPRESS_SIZE = 256  # Below this the framing costs more than compression saves
+
+
+def minify_css(source: str) -> str:
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = re.sub(r"\s+", " ", source)
+    source = re.sub(r"\s*([{};,>])\s*", r"\1", source)
+    source = re.sub(r":\s+", ":", source)  # Only after: "a :hover" needs its space
+    return source.replace(";}", "}").strip()
+
+
+def minify_js(source: str) -> str:
+    """Drop indentation, blank lines and whole-line comments.
+
+    Line breaks are kept so automatic semicolon insertion still applies, and
+    lines that continue a template literal are left untouched.
+    """
+    lines = []
+    in_comment = False
+    templates = []  # Brace depth of each open ${...} substitution; None while in template text
+    for line in source.splitlines():
+        if templates and templates[-1] is None:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if in_comment:
+                if "*/" not in stripped:
+                    continue
+                in_comment = False
+                stripped = stripped.split("*/", 1)[1].strip()
+            if stripped.startswith("/*") and "*/" not in stripped:
+                in_comment = True
+                continue
+            if not stripped or stripped.startswith("//"):
+                continue
+            lines.append(stripped)
+        _scan_js_line(lines[-1], templates)
+    return "\n".join(lines) + "\n"
+
+
+def _scan_js_line(line: str, templates: list) -> None:
+    # Track template literals across lines; ' and " strings end on the same line
+    quote = None
+    i = 0
+    while i < len(line):
+        char = line[i]
+        in_template = bool(templates) and templates[-1] is None
+        if char == "\\":
+            i += 2
+            continue
+        if quote:
+            if char == quote:
+                quote = None
+        elif in_template:
+            if char == "`":
+                templates.pop()
+            elif line.startswith("${", i):
+                templates[-1] = 0
+                i += 1
+        elif char in "'\"":
+            quote = char
+        elif char == "`":
+            templates.append(None)
+        elif line.startswith("//", i):
+            break
+        elif templates and char == "{":
+            templates[-1] += 1
+        elif templates and char == "}":
+            if templates[-1] == 0:
+                templates[-1] = None  # Back in the template text
+            else:
+                templates[-1] -= 1
+        i += 1
+
+
+ASSET_TYPES: Dict[str, Tuple[str, Optional[Callable[[str], str]]]] = {
+    ".js": ("text/javascript; charset=utf-8", minify_js),
+    ".css": ("text/css; charset=utf-8", minify_css),
+    ".svg": ("image/svg+xml", None),
+}
+
+
+@dataclass
+class Asset:
+    name: str
+    hashed_name: str
+    media_type: str
+    digest: str
+    variants: Dict[str, bytes] = field(default_factory=dict)  # Content-Encoding -> body
+
+    def etag(self, coding: str) -> str:
+        # Each encoding is a different representation, so it gets its own strong ETag
+        return f'"{self.digest}"' if coding == "identity" else f'"{self.digest}-{coding}"'
+
+
+def build_asset(name: str, raw: bytes) -> Asset:
+    media_type, minify = ASSET_TYPES[os.path.splitext(name)[1]]
+    body = minify(raw.decode("utf-8")).encode("utf-8") if minify else raw
+    digest = hashlib.sha256(body).hexdigest()[:12]
+    stem, ext = os.path.splitext(name)
+    asset = Asset(name=name, hashed_name=f"{stem}.{digest}{ext}", media_type=media_type, digest=digest)
+    asset.variants["identity"] = body
+    if len(body) >= MIN_COMPRESS_SIZE:
+        # Precompressed once at maximum level, since the cost is paid at startup only
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        for coding, data in compressed.items():
+            if len(data) < len(body):
+                asset.variants[coding] = data
+    return asset
+
+
+class AssetPipeline:
+    def __init__(self, directory: str = FRONTEND_DIR):
+        self.directory = directory
+        self.assets: Dict[str, Asset] = {}
+        self.mtime = 0.0  # Newest source file, so pages can date their rewritten references
+        self._paths: Dict[str, Tuple[Asset, bool]] = {}  # URL path -> (asset, fingerprinted)
+
+    def build(self) -> None:
+        assets = {}
+        mtime = 0.0
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if os.path.splitext(filename)[1] not in ASSET_TYPES:
+                    continue
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                with open(path, "rb") as file:
+                    assets[name] = build_asset(name, file.read())
+                    mtime = max(mtime, os.fstat(file.fileno()).st_mtime)
+
+        paths = {}
+        for asset in assets.values():
+            paths[asset.name] = (asset, False)
+            paths[asset.hashed_name] = (asset, True)
+        self.assets, self.mtime, self._paths = assets, mtime, paths
+        logger.info(f"Built {len(assets)} static assets")
+
+    def lookup(self, path: str) -> Optional[Tuple[Asset, bool]]:
+        return self._paths.get(path)
+
+    def url(self, name: str) -> str:
+        asset = self.assets.get(name)
+        return f"/static/{asset.hashed_name if asset else name}"
+
+    def rewrite_html(self, html: bytes) -> bytes:
+        """Point /static/ references at the fingerprinted asset names."""
+        return re.sub(
+            rb"""(?<=["'])/static/([^"'?#]+)(?=["'])""",
+            lambda match: self.url(match.group(1).decode("utf-8")).encode("utf-8"),
+            html,
+        )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def negotiate_encoding(accept_encoding: str, available) -> str:
+    """Best content coding the client accepts: brotli, then gzip, then none."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in ("br", "gzip"):
+        if coding in available and accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return "identity"
+
+
+class AssetFiles(StaticFiles):
+    """StaticFiles that serves pipeline assets from memory and everything else from disk."""
+
+    def __init__(self, *, pipeline: AssetPipeline, **kwargs):
+        super().__init__(**kwargs)
+        self.pipeline = pipeline
+
+    async def get_response(self, path: str, scope) -> Response:
+        found = self.pipeline.lookup(path)
+        if found is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+
+        asset, fingerprinted = found
+        request_headers = Headers(scope=scope)
+        coding = negotiate_encoding(request_headers.get("accept-encoding", ""), asset.variants)
+        headers = {
+            "ETag": asset.etag(coding),
+            "Vary": "Accept-Encoding",
+            "Cache-Control": IMMUTABLE if fingerprinted else "no-cache",
+        }
+        if etag_matches(request_headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(asset.variants[coding], media_type=asset.media_type, headers=headers)
+
+
+assets = AssetPipeline()
@@ -0,0 +1,105 @@
+from typing import Dict, Hashable, List, Optional
+import os
+
+from cachetools import TTLCache
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# In-process caches for read-heavy endpoints. The crud write paths invalidate
+# them as soon as they commit; the TTLs bound staleness from writes made by
+# other worker processes.
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "60"))
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL", "300"))
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "10000"))
+
+_registry: List["StatsCache"] = []
+
+
+class StatsCache:
+    """LRU/TTL cache that counts its hits and misses."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        _registry.append(self)
+
+    def get(self, key, default=None):
+        try:
+            value = self._cache[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        self._cache[key] = value
+
+    def pop(self, key) -> None:
+        self._cache.pop(key, None)
+
+    def keys(self) -> list:
+        return list(self._cache.keys())
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+# Row counts for paginated list endpoints, keyed by (table name, filter key)
+count_cache = StatsCache("counts", maxsize=512, ttl=COUNT_CACHE_TTL)
+
+# Dashboard KPI summaries, keyed by the day they were computed for. The
+# summary reads every table, so any write drops it.
+dashboard_cache = StatsCache("dashboard", maxsize=8, ttl=DASHBOARD_CACHE_TTL)
+
+# Read-only snapshots (schemas, not ORM objects) of single rows by id. Only
+# names are read from them: other workers' writes are not seen until the TTL.
+laborer_cache = StatsCache("laborers", maxsize=ENTITY_CACHE_SIZE, ttl=ENTITY_CACHE_TTL)
+site_cache = StatsCache("sites", maxsize=ENTITY_CACHE_SIZE, ttl=ENTITY_CACHE_TTL)
+
+
+async def cached_count(db: AsyncSession, model, *criteria, filter_key: Optional[Hashable] = None) -> int:
+    """COUNT(*) of ``model`` rows matching ``criteria``, served from cache when possible.
+
+    ``filter_key`` must identify ``criteria`` uniquely; leave it None for the unfiltered count.
+    """
+    key = (model.__tablename__, filter_key)
+    count = count_cache.get(key)
+    if count is None:
+        result = await db.execute(select(func.count()).select_from(model).where(*criteria))
+        count = result.scalar()
+        count_cache[key] = count
+    return count
+
+
+def invalidate_tables(*tablenames: str) -> None:
+    """Drop the counts and summaries computed from the given tables after a write to them."""
+    for key in count_cache.keys():
+        if key[0] in tablenames:
+            count_cache.pop(key)
+    dashboard_cache.clear()
+
+
+def cache_stats() -> Dict[str, dict]:
+    return {cache.name: cache.stats() for cache in _registry}
+
+
+def clear_caches() -> None:
+    """Empty every cache and reset its counters."""
+    for cache in _registry:
+        cache.clear()
+        cache.hits = cache.misses = 0
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+try:  # File locks need fcntl; without it (Windows) every process acts as leader
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from backend.utility import LOCAL_FILE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Startup coordination between uvicorn worker processes. Two advisory file
+# locks next to the database decide the roles:
+#   - the leader lock is held by one process for its whole lifetime, and that
+#     process alone does the Drive sync, schema setup and shutdown upload;
+#   - the setup lock is held while a process decides its role and, for the
+#     leader, until setup is done. A follower gets it only after the leader
+#     has released it, so when setup() returns the database is ready.
+# If the leader dies its locks are released by the OS and the next worker to
+# start takes over.
+LOCK_DIR = os.getenv("WORKER_LOCK_DIR", os.path.dirname(LOCAL_FILE_PATH))
+LOCK_NAME = os.path.basename(LOCAL_FILE_PATH)
+
+
+class StartupCoordinator:
+    def __init__(self, lock_dir: str = LOCK_DIR, name: str = LOCK_NAME):
+        self.setup_path = os.path.join(lock_dir, f"{name}.setup.lock")
+        self.leader_path = os.path.join(lock_dir, f"{name}.leader.lock")
+        self.is_leader = False
+        self._leader_file = None
+
+    @asynccontextmanager
+    async def setup(self) -> AsyncIterator[bool]:
+        """Decide this process's role; yields True when it should run the startup tasks.
+
+        Followers yield False only once the leader's block has finished.
+        """
+        if fcntl is None:
+            logger.warning("fcntl is unavailable; run a single worker so startup tasks do not race")
+            self.is_leader = True
+            yield True
+            return
+
+        setup_file = open(self.setup_path, "a")
+        try:
+            await asyncio.to_thread(fcntl.flock, setup_file, fcntl.LOCK_EX)  # Waits for a leader's setup
+            self.is_leader = self._try_lead()
+            logger.info(f"Worker {os.getpid()} is the {'leader' if self.is_leader else 'follower'}")
+            yield self.is_leader
+        finally:
+            setup_file.close()  # Closing releases the setup lock
+
+    def _try_lead(self) -> bool:
+        leader_file = open(self.leader_path, "a")
+        try:
+            fcntl.flock(leader_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            leader_file.close()
+            return False
+        self._leader_file = leader_file
+        return True
+
+    def release(self) -> None:
+        """Give up leadership; call after the shutdown tasks."""
+        if self._leader_file is not None:
+            self._leader_file.close()
+            self._leader_file = None
+        self.is_leader = False
+
+
+coordinator = StartupCoordinator()
@@ -1,37 +1,115 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select,func,update, delete
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import select,func,insert,update, delete, case, literal_column, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from fastapi import HTTPException
 from backend import models, schemas
-from sqlalchemy.orm import selectinload,joinedload
+from sqlalchemy.orm import joinedload
 from backend.models import Attendance,Site,Material,Payment
 from backend.schemas import PaymentCreate,PaymentUpdate
-from typing import List,Optional
+from backend.pagination import paginate, decode_date_cursor
+from backend.units import to_canonical, CANONICAL_UNITS
+from backend.cache import cached_count, invalidate_tables, dashboard_cache, laborer_cache, site_cache
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+is_present = func.lower(Attendance.present).in_(models.PRESENT_MARKS)
+
+# Run an INSERT or UPDATE ... RETURNING and hand back the written row, so a write
+# is one statement with no refresh afterwards; None when an UPDATE matched nothing
+async def write_returning(db: AsyncSession, stmt, model):
+    result = await db.scalars(stmt.returning(model), execution_options={"populate_existing": True})
+    return result.one_or_none()
+
+
+## Cached lookups
+# Read-through snapshots of laborers and sites by id, used only to put names on
+# responses. The create and update functions below store the row their RETURNING
+# clause hands back and the deletes drop the entry, but only in this process:
+# another worker may still hold a renamed or deleted row until the TTL expires.
+# Single-row reads therefore always ask the database, and writes that reference
+# a cached row leave the existence check to the foreign key.
+
+async def _cached_rows(db: AsyncSession, cache, model, schema, ids: Iterable[int]) -> dict:
+    found, missing = {}, set()
+    for row_id in set(ids) - {None}:
+        snapshot = cache.get(row_id)
+        if snapshot is None:
+            missing.add(row_id)
+        else:
+            found[row_id] = snapshot
+    if missing:
+        # Every miss is loaded with a single IN query
+        result = await db.execute(select(model).where(model.id.in_(missing)))
+        for row in result.scalars().all():
+            found[row.id] = cache[row.id] = schema.model_validate(row)
+    return found
+
+async def get_cached_labours(db: AsyncSession, labour_ids: Iterable[int]) -> Dict[int, schemas.Laborer]:
+    return await _cached_rows(db, laborer_cache, models.Laborer, schemas.Laborer, labour_ids)
+
+async def get_cached_labour(db: AsyncSession, labour_id: int) -> Optional[schemas.Laborer]:
+    return (await get_cached_labours(db, [labour_id])).get(labour_id)
+
+async def get_cached_sites(db: AsyncSession, site_ids: Iterable[int]) -> Dict[int, schemas.Site]:
+    return await _cached_rows(db, site_cache, Site, schemas.Site, site_ids)
+
+async def get_cached_site(db: AsyncSession, site_id: int) -> Optional[schemas.Site]:
+    return (await get_cached_sites(db, [site_id])).get(site_id)
+
+# The ids that have no row in the database, checked with one IN query
+async def missing_ids(db: AsyncSession, model, ids: Iterable[int]) -> set:
+    ids = set(ids) - {None}
+    if not ids:
+        return set()
+    found = await db.scalars(select(model.id).where(model.id.in_(ids)))
+    return ids - set(found)
+
 
 # Create Labour
 async def create_labour(db: AsyncSession, labour: schemas.LaborerCreate):
     try:
-        db_labour = models.Laborer(**labour.model_dump())
-        db.add(db_labour)
-        await db.flush()  # Flush before commit to handle potential primary key creation
+        db_labour = await write_returning(db, insert(models.Laborer).values(**labour.model_dump()), models.Laborer)
         await db.commit()
-        await db.refresh(db_labour)
+        invalidate_tables("laborers")
+        laborer_cache[db_labour.id] = schemas.Laborer.model_validate(db_labour)
         return db_labour
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail="Database error occurred")
 
+# List pages select just the response columns, with names joined in SQL, and
+# return the rows as they come back: no ORM instances or identity map entries,
+# no per-row dicts. FastAPI validates each row once against the response model.
+
 # Get All Labours
-async def get_labours(db: AsyncSession, skip: int = 0, limit: int = 10):
-    result = await db.execute(select(models.Laborer).offset(skip).limit(limit))
-    return result.scalars().all()
+async def get_labours(db: AsyncSession, skip: int = 0, limit: int = 10, cursor: Optional[str] = None):
+    result = await db.execute(paginate(select(models.Laborer.__table__), models.Laborer.id, skip, limit, cursor))
+    return result.all()
+
+# Build an FTS5 prefix query: every word typed must prefix-match a word of the name
+def build_name_match(name: str) -> Optional[str]:
+    terms = re.findall(r"\w+", name)
+    if not terms:
+        return None
+    return " AND ".join('"' + term.replace('"', '""') + '"*' for term in terms)
 
 # Search Labours by Name
-async def search_labours(db: AsyncSession, name: str):
-    result = await db.execute(select(models.Laborer).filter(models.Laborer.name.ilike(f"%{name}%")))
+async def search_labours(db: AsyncSession, name: str, limit: int = 20):
+    match = build_name_match(name)
+    if match is None:
+        return []
+    result = await db.execute(
+        select(models.Laborer)
+        .join(models.laborers_fts, models.laborers_fts.c.rowid == models.Laborer.id)
+        .where(literal_column("laborers_fts").op("MATCH")(match))
+        .order_by(models.laborers_fts.c.rank)  # bm25 relevance, best match first
+        .limit(limit)
+    )
     return result.scalars().all()
 
 # Get a single Labour by ID
@@ -41,12 +119,13 @@ async def get_labour(db: AsyncSession, labour_id: int):
 
 # Update Labour
 async def update_labour(db: AsyncSession, labour_id: int, updated_data: schemas.LaborerCreate):
-    labour = await get_labour(db, labour_id)
+    labour = await write_returning(
+        db, update(models.Laborer).where(models.Laborer.id == labour_id).values(**updated_data.model_dump()), models.Laborer
+    )
     if labour:
-        for key, value in updated_data.model_dump().items():
-            setattr(labour, key, value)
         await db.commit()
-        await db.refresh(labour)
+        invalidate_tables("laborers")
+        laborer_cache[labour_id] = schemas.Laborer.model_validate(labour)
         return labour
     return None
 
@@ -54,63 +133,273 @@ async def update_labour(db: AsyncSession, labour_id: int, updated_data: schemas.
 async def delete_labour(db: AsyncSession, labour_id: int):
     labour = await get_labour(db, labour_id)
     if labour:
-        await db.delete(labour)
-        await db.commit()
+        try:
+            await db.delete(labour)
+            await db.commit()
+        except IntegrityError:
+            # Payments reference the laborer and are kept as a record
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Laborer still has payments")
+        invalidate_tables("laborers", "attendance")
+        laborer_cache.pop(labour_id)
         return True
     return False
 
-# Create Attendance Record
-async def create_attendance(db: AsyncSession, labour_id: int, attendance: schemas.AttendanceBase):
-    # Create a new Attendance instance
-    new_attendance = models.Attendance(
-        laborer_id=labour_id,
-        date=attendance.date,  # Assuming date is part of the attendance object
-        present=attendance.present,
-        hours_worked=attendance.hours_worked,
-        site_name=attendance.site_name,
+# INSERT ... ON CONFLICT (laborer_id, date) DO UPDATE, so a retried mark overwrites the day's row
+def attendance_upsert():
+    stmt = sqlite_insert(Attendance)
+    return stmt.on_conflict_do_update(
+        index_elements=[Attendance.laborer_id, Attendance.date],
+        set_={
+            "present": stmt.excluded.present,
+            "hours_worked": stmt.excluded.hours_worked,
+            "site_name": stmt.excluded.site_name,
+        },
     )
-    
-    db.add(new_attendance)
+
+# Create Attendance Record (idempotent per laborer and date)
+async def create_attendance(db: AsyncSession, labour_id: int, attendance: schemas.AttendanceBase):
+    new_attendance = await write_attendance(db, labour_id, attendance)
     await db.commit()
-    await db.refresh(new_attendance)  # Refresh to get the newly created instance
+    invalidate_tables("attendance")
     return new_attendance
 
+# The upsert alone, without committing; used by the group-commit write queue
+async def write_attendance(db: AsyncSession, labour_id: int, attendance: schemas.AttendanceBase) -> Attendance:
+    stmt = attendance_upsert().values({
+        "laborer_id": labour_id,
+        "date": attendance.date,  # Assuming date is part of the attendance object
+        "present": attendance.present,
+        "hours_worked": attendance.hours_worked,
+        "site_name": attendance.site_name,
+    })
+    # RETURNING hands back the inserted or updated row, so no refresh is needed
+    return await write_returning(db, stmt, Attendance)
+
+
+# Record a whole crew's roll-call in one transaction
+async def create_attendance_bulk(db: AsyncSession, bulk: schemas.AttendanceBulkCreate) -> List[schemas.Attendance]:
+    if not bulk.marks:
+        return []
+
+    # Last mark wins when a laborer appears twice in the same roll-call
+    marks = {mark.laborer_id: mark for mark in bulk.marks}
+
+    # One query checks that every laborer exists and brings back their names
+    laborer_ids = set(marks)
+    result = await db.execute(select(models.Laborer.id, models.Laborer.name).where(models.Laborer.id.in_(laborer_ids)))
+    names = dict(result.all())
+    missing = sorted(laborer_ids - names.keys())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Laborer not found: {', '.join(map(str, missing))}")
+
+    try:
+        # Batched multi-row upsert ... RETURNING, so ids come back without a refresh per row
+        result = await db.execute(
+            attendance_upsert().returning(
+                Attendance.id, Attendance.laborer_id, Attendance.date,
+                Attendance.present, Attendance.hours_worked, Attendance.site_name,
+                sort_by_parameter_order=True,
+            ),
+            [
+                {
+                    "laborer_id": mark.laborer_id,
+                    "date": bulk.date,
+                    "present": mark.present,
+                    "hours_worked": mark.hours_worked,
+                    "site_name": bulk.site_name,
+                }
+                for mark in marks.values()
+            ],
+        )
+        rows = result.all()
+        await db.commit()
+        invalidate_tables("attendance")
+    except SQLAlchemyError as e:
+        logger.error(f"Database error occurred while recording bulk attendance: {e}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+    return [
+        schemas.Attendance(
+            id=row.id,
+            laborer_id=row.laborer_id,
+            laborer_name=names[row.laborer_id],
+            date=row.date,
+            present=row.present,
+            hours_worked=row.hours_worked,
+            site_name=row.site_name
+        )
+        for row in rows
+    ]
 
 
 # CRUD function to get attendance with pagination
-async def get_all_attendance(db: AsyncSession, skip: int, limit: int):
+async def get_all_attendance(db: AsyncSession, skip: int, limit: int, cursor: Optional[str] = None):
     result = await db.execute(
-        select(models.Attendance)
-        .options(selectinload(models.Attendance.laborer))  # Assuming you have a relationship named 'laborer'
-        .offset(skip)
-        .limit(limit)
+        paginate(
+            select(
+                Attendance.id,
+                Attendance.laborer_id,
+                models.Laborer.name.label("laborer_name"),
+                Attendance.date,
+                Attendance.present,
+                Attendance.hours_worked,
+                Attendance.site_name,
+            ).join(models.Laborer, models.Laborer.id == Attendance.laborer_id),
+            Attendance.id, skip, limit, cursor
+        )
     )
-    return [
-        {
-            "id": attendance.id,
-            "laborer_id": attendance.laborer.id,
-            "laborer_name": attendance.laborer.name,  # Access the laborer name here
-            "date": attendance.date,
-            "present": attendance.present,
-            "hours_worked": attendance.hours_worked,
-            "site_name": attendance.site_name
-        }
-        for attendance in result.scalars().all()
-    ]
+    return result.all()
 
 
 # Function to count total attendance records
 async def count_all_attendance(db: AsyncSession) -> int:
-    query = select(func.count()).select_from(models.Attendance)  # Count total records
+    return await count_rows(db, models.Attendance)  # Cached until the next attendance write
+
+# Total rows of a table for pagination, cached per table until its next write
+async def count_rows(db: AsyncSession, model) -> int:
+    return await cached_count(db, model)
+
+
+# Restrict an attendance query to one laborer and an optional date range
+def filter_attendance_range(query, laborer_id: int, from_date: Optional[date] = None, to_date: Optional[date] = None):
+    query = query.where(Attendance.laborer_id == laborer_id)
+    if from_date is not None:
+        query = query.where(Attendance.date >= from_date)
+    if to_date is not None:
+        query = query.where(Attendance.date <= to_date)
+    return query
+
+# Get Attendance History, oldest first, one page of days at a time.
+# (laborer_id, date) is unique, so the date alone is the keyset cursor.
+async def get_attendance_history(
+    db: AsyncSession,
+    laborer_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> List[schemas.Attendance]:
+    query = filter_attendance_range(
+        select(Attendance, models.Laborer.name).join(Attendance.laborer), laborer_id, from_date, to_date
+    ).order_by(Attendance.date)
+    if cursor:
+        query = query.where(Attendance.date > decode_date_cursor(cursor))
+    if limit is not None:
+        query = query.limit(limit)
     result = await db.execute(query)
-    return result.scalar()  # Return the count
+    return [
+        schemas.Attendance(
+            id=attendance.id,
+            laborer_id=attendance.laborer_id,
+            laborer_name=laborer_name,
+            date=attendance.date,
+            present=attendance.present,
+            hours_worked=attendance.hours_worked,
+            site_name=attendance.site_name
+        )
+        for attendance, laborer_name in result.all()
+    ]
+
+# Days present/absent and hours for one laborer, aggregated by SQLite
+async def get_attendance_summary(
+    db: AsyncSession, laborer_id: int, from_date: Optional[date] = None, to_date: Optional[date] = None
+) -> schemas.AttendanceSummary:
+    query = filter_attendance_range(
+        select(
+            func.count().filter(is_present),
+            func.count().filter(~is_present),
+            func.coalesce(func.sum(Attendance.hours_worked), 0.0),
+        ),
+        laborer_id, from_date, to_date,
+    )
+    days_present, days_absent, hours_worked = (await db.execute(query)).one()
+    return schemas.AttendanceSummary(
+        laborer_id=laborer_id,
+        from_date=from_date,
+        to_date=to_date,
+        days_present=days_present,
+        days_absent=days_absent,
+        hours_worked=hours_worked,
+    )
+
+# Payroll for every laborer with attendance in the range, in one GROUP BY query.
+# A present day pays daily_wage * hours_worked / shift_hours; a day with no
+# hours recorded counts as a full shift.
+async def get_payroll(
+    db: AsyncSession, from_date: date, to_date: date, site_name: Optional[str] = None, shift_hours: float = 8.0
+) -> schemas.PayrollSheet:
+    present_hours = case((is_present, func.coalesce(Attendance.hours_worked, shift_hours)), else_=0.0)
+    payable_days = func.coalesce(func.sum(present_hours), 0.0) / shift_hours
+    query = (
+        select(
+            models.Laborer.id,
+            models.Laborer.name,
+            models.Laborer.daily_wage,
+            func.count().filter(is_present).label("days_present"),
+            func.coalesce(func.sum(present_hours), 0.0).label("hours_worked"),
+            func.round(payable_days, 4).label("payable_days"),
+            func.round(func.coalesce(models.Laborer.daily_wage, 0.0) * payable_days, 2).label("amount"),
+        )
+        .join(Attendance, Attendance.laborer_id == models.Laborer.id)
+        .where(Attendance.date >= from_date, Attendance.date <= to_date)
+        .group_by(models.Laborer.id)
+        .order_by(models.Laborer.name, models.Laborer.id)
+    )
+    if site_name is not None:
+        query = query.where(Attendance.site_name == site_name)
 
+    result = await db.execute(query)
+    entries = [
+        schemas.PayrollEntry(
+            laborer_id=row.id,
+            laborer_name=row.name,
+            daily_wage=row.daily_wage or 0.0,
+            days_present=row.days_present,
+            hours_worked=row.hours_worked,
+            payable_days=row.payable_days,
+            amount=row.amount,
+        )
+        for row in result.all()
+    ]
+    return schemas.PayrollSheet(
+        site_name=site_name,
+        from_date=from_date,
+        to_date=to_date,
+        shift_hours=shift_hours,
+        entries=entries,
+        total_amount=round(sum(entry.amount for entry in entries), 2),
+    )
 
-# Get Attendance History
-async def get_attendance_history(db: AsyncSession, laborer_id: int):
-    result = await db.execute(select(models.Attendance).filter(models.Attendance.laborer_id == laborer_id))
+# Per-site daily headcount and hours, read from the trigger-maintained rollup
+async def get_attendance_daily(
+    db: AsyncSession, site_name: Optional[str] = None, from_date: Optional[date] = None, to_date: Optional[date] = None
+) -> List[models.AttendanceDaily]:
+    # Triggers change these rows behind the ORM's back, so never trust the identity map
+    query = select(models.AttendanceDaily).execution_options(populate_existing=True)
+    if site_name is not None:
+        query = query.where(models.AttendanceDaily.site_name == site_name)
+    if from_date is not None:
+        query = query.where(models.AttendanceDaily.date >= from_date)
+    if to_date is not None:
+        query = query.where(models.AttendanceDaily.date <= to_date)
+    result = await db.execute(query.order_by(models.AttendanceDaily.date, models.AttendanceDaily.site_name))
     return result.scalars().all()
 
+# Regenerate the daily rollup from scratch, e.g. after a restore or manual SQL edits
+async def rebuild_attendance_daily(db: AsyncSession) -> int:
+    try:
+        for statement in models.ATTENDANCE_DAILY_REBUILD:
+            await db.execute(text(statement))
+        await db.commit()
+    except SQLAlchemyError as e:
+        logger.error(f"Database error occurred while rebuilding the attendance rollup: {e}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Database error occurred")
+    result = await db.execute(select(func.count()).select_from(models.AttendanceDaily))
+    return result.scalar()
+
 # get single attendance
 async def get_attendance(db: AsyncSession, attendance_id: int) -> schemas.Attendance:
     # Join Attendance with the Laborer table to get the laborer_name
@@ -144,6 +433,7 @@ async def delete_attendance(db: AsyncSession, attendance_id: int):
         # If attendance record is found, delete it
         await db.delete(attendance)
         await db.commit()  # Commit the transaction
+        invalidate_tables("attendance")
         return True
 
     return False  # Return False if attendance record is not found
@@ -151,33 +441,33 @@ async def delete_attendance(db: AsyncSession, attendance_id: int):
 
 # Update attendance function to include laborer_name
 async def update_attendance(db: AsyncSession, attendance_id: int, attendance_data: schemas.AttendanceUpdate) -> schemas.Attendance:
-    # Fetch the attendance record to update
-    result = await db.execute(
-        select(Attendance).options(joinedload(Attendance.laborer)).filter(Attendance.id == attendance_id)
-    )
-    attendance = result.scalar_one_or_none()
-
-    if attendance is None:
-        return None  # Return None if the attendance record does not exist
-
-    # Update the attendance record fields
-    if attendance_data.present is not None:
-        attendance.present = attendance_data.present
-    if attendance_data.hours_worked is not None:
-        attendance.hours_worked = attendance_data.hours_worked
-    if attendance_data.date is not None:
-        attendance.date = attendance_data.date
-    if attendance_data.site_name is not None:
-        attendance.site_name = attendance_data.site_name
-
-    await db.commit()
-    await db.refresh(attendance)
+    # Only the fields that were sent are changed
+    values = {
+        field: value
+        for field, value in attendance_data.model_dump(include={"present", "hours_worked", "date", "site_name"}).items()
+        if value is not None
+    }
+    try:
+        if values:
+            attendance = await write_returning(
+                db, update(Attendance).where(Attendance.id == attendance_id).values(**values), Attendance
+            )
+        else:
+            attendance = await db.get(Attendance, attendance_id)
+        if attendance is None:
+            return None  # Return None if the attendance record does not exist
+        await db.commit()
+        invalidate_tables("attendance")
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Attendance already recorded for this laborer on that date")
 
-    # Return the updated attendance, including the laborer's name
+    # Return the updated attendance, with the laborer's name from the lookup cache
+    laborer = await get_cached_labour(db, attendance.laborer_id)
     return schemas.Attendance(
         id=attendance.id,
         laborer_id=attendance.laborer_id,
-        laborer_name=attendance.laborer.name,  # Fetch laborer name from related model
+        laborer_name=laborer.name if laborer else "Unknown",
         date=attendance.date,
         present=attendance.present,
         hours_worked=attendance.hours_worked,
@@ -188,16 +478,15 @@ async def update_attendance(db: AsyncSession, attendance_id: int, attendance_dat
 ## Material Invetory Codes
 
 async def create_material(db: AsyncSession, material: schemas.MaterialCreate) -> schemas.Material:
-    # Check if the site_id exists
-    site = await db.get(Site, material.site_id)
-    if not site:
+    # The site's name comes from the lookup cache; the foreign key rejects a deleted site
+    site = await get_cached_site(db, material.site_id)
+    if site is None:
         raise HTTPException(status_code=404, detail="Site not found")
-    
+
     try:
-        new_material = models.Material(**material.model_dump())
-        db.add(new_material)
+        new_material = await write_returning(db, insert(Material).values(**material.model_dump()), Material)
         await db.commit()
-        await db.refresh(new_material)
+        invalidate_tables("materials")
 
         # Return the material including site_name
         return schemas.Material(
@@ -210,6 +499,10 @@ async def create_material(db: AsyncSession, material: schemas.MaterialCreate) ->
             transport_type=new_material.transport_type,
             site_name=site.name  # Include the site name here
         )
+    except IntegrityError:
+        # The site was deleted after it was cached
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Site not found")
     except SQLAlchemyError as e:
         print(f"Database error occurred while creating material: {e}")
         raise HTTPException(status_code=500, detail="Failed to create material")
@@ -236,29 +529,29 @@ async def get_material(db: AsyncSession, material_id: int) -> Optional[schemas.M
         raise HTTPException(status_code=500, detail="Database error occurred")
 
 
-async def get_materials(db: AsyncSession, skip: int = 0, limit: int = 10) -> List[Material]:
+async def get_materials(db: AsyncSession, skip: int = 0, limit: int = 10, cursor: Optional[str] = None) -> List[Row]:
     try:
-        query = select(Material).options(joinedload(Material.site)).offset(skip).limit(limit)
-        result = await db.execute(query)
-        materials = result.scalars().all()
-        
-        return [{
-            "id": mat.id,
-            "name": mat.name,
-            "quantity": mat.quantity,
-            "unit": mat.unit,
-            "site_id": mat.site_id,
-            "site_name": mat.site.name if mat.site else None,
-            "arrival_date": mat.arrival_date,
-            "transport_type": mat.transport_type
-        } for mat in materials]
+        query = select(
+            Material.id,
+            Material.name,
+            Material.quantity,
+            Material.unit,
+            Material.site_id,
+            Site.name.label("site_name"),
+            Material.arrival_date,
+            Material.transport_type,
+        ).outerjoin(Site, Site.id == Material.site_id)
+        result = await db.execute(paginate(query, Material.id, skip, limit, cursor))
+        return result.all()
     except Exception as e:
         logger.error("Error fetching materials", exc_info=e)
         raise HTTPException(status_code=500, detail="Database error occurred")
 
 
 async def update_material(db: AsyncSession, material_id: int, material: schemas.MaterialUpdate) -> schemas.Material:
-    # Update directly using the material ID
+    site = await get_site(db, material.site_id)  # 404 for unknown sites
+
+    # Update directly using the material ID; RETURNING gives back the new row
     query = (
         update(Material)
         .where(Material.id == material_id)
@@ -273,17 +566,23 @@ async def update_material(db: AsyncSession, material_id: int, material: schemas.
     )
 
     try:
-        result = await db.execute(query)
-        if result.rowcount == 0:
+        # The arrival being changed may already have been drawn on
+        await lock_stock(db)
+        old = (await db.execute(
+            select(Material.site_id, Material.name, Material.unit).where(Material.id == material_id)
+        )).one_or_none()
+        updated_material = await write_returning(db, query, Material)
+        if updated_material is None:
+            await db.rollback()
             raise HTTPException(status_code=404, detail="Material not found or no changes made.")
+        await check_stock(db, *old)
         await db.commit()  # Commit the changes
+        invalidate_tables("materials")
     except SQLAlchemyError as e:
         logger.error(f"Database error occurred while updating material {material_id}: {e}")
         await db.rollback()  # Roll back in case of error
         raise HTTPException(status_code=500, detail="Database error occurred")
 
-    # Return updated material details, assuming you want to retrieve them afterward
-    updated_material = await db.get(Material, material_id)
     return schemas.Material(
         id=updated_material.id,
         name=updated_material.name,
@@ -292,19 +591,26 @@ async def update_material(db: AsyncSession, material_id: int, material: schemas.
         site_id=updated_material.site_id,
         arrival_date=updated_material.arrival_date,
         transport_type=updated_material.transport_type,
-        site_name='Unknown'
+        site_name=site.name
     )
 
 async def delete_material(db: AsyncSession, material_id: int) -> Optional[schemas.Material]:
     try:
-        # Fetch the material to ensure it exists
-        material = await db.get(Material, material_id)
-        
+        # Fetch the material to ensure it exists, with the write lock held
+        # since its arrival may already have been drawn on
+        await lock_stock(db)
+        material = await db.get(Material, material_id, populate_existing=True)
+
         if not material:
+            await db.rollback()
             return None  # Return None if no material is found with that ID
 
+        site = await get_cached_site(db, material.site_id)
         await db.delete(material)  # Delete the material
+        await db.flush()
+        await check_stock(db, material.site_id, material.name, material.unit)
         await db.commit()  # Commit the changes
+        invalidate_tables("materials")
         return schemas.Material(
             id=material.id,
             name=material.name,
@@ -313,8 +619,10 @@ async def delete_material(db: AsyncSession, material_id: int) -> Optional[schema
             site_id=material.site_id,
             arrival_date=material.arrival_date,
             transport_type=material.transport_type,
-            site_name='Unknown'
+            site_name=site.name if site else 'Unknown'
         )
+    except HTTPException:
+        raise
     except SQLAlchemyError as e:
         logger.error(f"Database error occurred while deleting material {material_id}: {e}")
         await db.rollback()  # Roll back in case of error
@@ -324,15 +632,130 @@ async def delete_material(db: AsyncSession, material_id: int) -> Optional[schema
         await db.rollback()  # Roll back for any other exceptions
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
     
+## Material stock ledger
+
+# Current balance of one material at a site (a primary-key lookup)
+async def get_stock_balance(db: AsyncSession, site_id: int, material_name: str, unit: models.UnitType) -> float:
+    result = await db.execute(
+        select(models.MaterialStock.quantity)
+        .where(
+            models.MaterialStock.site_id == site_id,
+            models.MaterialStock.material_name == material_name,
+            models.MaterialStock.unit == unit,
+        )
+    )
+    return result.scalar() or 0.0
+
+# Take SQLite's write lock before reading a balance that the write depends on.
+# pysqlite only opens a transaction at the first INSERT/UPDATE/DELETE, so a
+# plain read would run on its own and two writers could both see the same
+# stock; with the lock held, no other connection can change it until commit.
+async def lock_stock(db: AsyncSession) -> None:
+    await db.execute(text("BEGIN IMMEDIATE"))
+
+# Stock may not go below zero: roll back the write with a 409 if it would
+async def check_stock(db: AsyncSession, site_id: Optional[int], material_name: Optional[str], unit: models.UnitType) -> None:
+    if site_id is None or material_name is None:
+        return  # Detached materials were never in the ledger
+    balance = await get_stock_balance(db, site_id, material_name, unit)
+    if balance < -1e-9:
+        await db.rollback()
+        raise HTTPException(
+            status_code=409, detail=f"Insufficient stock: {material_name} at site {site_id} would fall to {balance:g} {unit.value}"
+        )
+
+# Record consumption at a site or a transfer between sites; balances follow by trigger
+async def create_material_movement(db: AsyncSession, movement: schemas.MaterialMovementCreate) -> models.MaterialMovement:
+    if movement.movement_type == models.MovementType.arrival:
+        raise HTTPException(status_code=400, detail="Record arrivals through /materials/")
+    if movement.quantity <= 0:
+        raise HTTPException(status_code=400, detail="Quantity must be positive")
+    if movement.movement_type == models.MovementType.transfer:
+        if movement.to_site_id is None or movement.to_site_id == movement.site_id:
+            raise HTTPException(status_code=400, detail="Transfers need a different destination site")
+    elif movement.to_site_id is not None:
+        raise HTTPException(status_code=400, detail="Only transfers have a destination site")
+
+    if await missing_ids(db, Site, [movement.site_id, movement.to_site_id]):
+        raise HTTPException(status_code=404, detail="Site not found")
+
+    try:
+        await lock_stock(db)
+        balance = await get_stock_balance(db, movement.site_id, movement.material_name, movement.unit)
+        if balance < movement.quantity:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail=f"Insufficient stock: {balance:g} {movement.unit.value} available")
+
+        new_movement = await write_returning(
+            db, insert(models.MaterialMovement).values(**movement.model_dump()), models.MaterialMovement
+        )
+        await db.commit()
+        invalidate_tables("material_movements", "material_stock")
+        return new_movement
+    except SQLAlchemyError as e:
+        logger.error(f"Database error occurred while recording material movement: {e}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+async def get_material_movements(
+    db: AsyncSession, site_id: Optional[int] = None, skip: int = 0, limit: int = 10, cursor: Optional[str] = None
+) -> List[Row]:
+    query = select(models.MaterialMovement.__table__)
+    if site_id is not None:
+        query = query.where(
+            (models.MaterialMovement.site_id == site_id) | (models.MaterialMovement.to_site_id == site_id)
+        )
+    result = await db.execute(paginate(query, models.MaterialMovement.id, skip, limit, cursor))
+    return result.all()
+
+# Current stock of every material at a site, read straight from the balance table
+async def get_site_stock(db: AsyncSession, site_id: int) -> List[models.MaterialStock]:
+    await get_site(db, site_id)  # 404 for unknown sites
+    result = await db.execute(
+        select(models.MaterialStock)
+        .where(models.MaterialStock.site_id == site_id)
+        .order_by(models.MaterialStock.material_name, models.MaterialStock.unit)
+        .execution_options(populate_existing=True)  # Balances are maintained by triggers
+    )
+    return result.scalars().all()
+
+# Stock totals per material in canonical units. SQLite sums each (name, unit)
+# group; the conversion registry then folds the few groups into dimensions.
+async def get_material_summary(db: AsyncSession, site_id: Optional[int] = None) -> schemas.MaterialSummary:
+    query = select(
+        models.MaterialStock.material_name, models.MaterialStock.unit, func.sum(models.MaterialStock.quantity)
+    ).group_by(models.MaterialStock.material_name, models.MaterialStock.unit)
+    if site_id is not None:
+        await get_site(db, site_id)  # 404 for unknown sites
+        query = query.where(models.MaterialStock.site_id == site_id)
+
+    totals = {}
+    for material_name, unit, quantity in (await db.execute(query)).all():
+        converted = to_canonical(material_name, unit, quantity)
+        if converted is None:
+            key, quantity = (material_name, unit.value, unit), quantity
+        else:
+            dimension, quantity = converted
+            key = (material_name, dimension, CANONICAL_UNITS[dimension])
+        totals[key] = totals.get(key, 0.0) + quantity
+
+    return schemas.MaterialSummary(
+        site_id=site_id,
+        totals=[
+            schemas.MaterialTotal(material_name=name, dimension=dimension, unit=unit, quantity=quantity)
+            for (name, dimension, unit), quantity in sorted(totals.items(), key=lambda item: item[0][:2])
+        ],
+    )
+
 ## SITES
 
 async def create_site(db: AsyncSession, site: schemas.SiteCreate) -> schemas.Site:
     try:
-        # Create a new site using model_dump to convert to a dict
-        new_site = models.Site(**site.model_dump())
-        db.add(new_site)
+        # Create a new site using model_dump to convert to a dict; RETURNING brings back the id
+        new_site = await write_returning(db, insert(Site).values(**site.model_dump()), Site)
         await db.commit()
-        await db.refresh(new_site)  # Refresh to get the auto-generated id
+        invalidate_tables("sites")
+        site_cache[new_site.id] = schemas.Site.model_validate(new_site)
         return new_site
     except SQLAlchemyError as e:
         # Log the error (you can replace this with your logging mechanism)
@@ -343,92 +766,116 @@ async def create_site(db: AsyncSession, site: schemas.SiteCreate) -> schemas.Sit
         print(f"Unexpected error occurred: {e}")
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
-async def get_sites(db: AsyncSession, skip: int = 0, limit: int = 10):
+async def get_sites(db: AsyncSession, skip: int = 0, limit: int = 10, cursor: Optional[str] = None):
     try:
         # Use `select` to get the sites from the database
-        result = await db.execute(select(Site).offset(skip).limit(limit))
-        return result.scalars().all()  # Return the list of sites
+        result = await db.execute(paginate(select(Site.__table__), Site.id, skip, limit, cursor))
+        return result.all()  # Return the list of sites
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail="Database error occurred")
 
 async def get_site(db: AsyncSession, site_id: int) -> Site:
-    site = await db.get(Site, site_id)
+    result = await db.execute(select(Site).where(Site.id == site_id))
+    site = result.scalar_one_or_none()
     if site is None:
         raise HTTPException(status_code=404, detail="Site not found")
     return site
 
 async def update_site(db: AsyncSession, site_id: int, site_data: schemas.SiteCreate) -> Site:
-    site = await db.get(Site, site_id)
+    site = await write_returning(db, update(Site).where(Site.id == site_id).values(**site_data.model_dump()), Site)
     if site is None:
         raise HTTPException(status_code=404, detail="Site not found")
-
-    for key, value in site_data.model_dump().items():
-        setattr(site, key, value)
-    db.add(site)
     await db.commit()
-    await db.refresh(site)
+    invalidate_tables("sites")
+    site_cache[site_id] = schemas.Site.model_validate(site)
     return site
 
 async def delete_site(db: AsyncSession, site_id: int) -> bool:
     site = await db.get(Site, site_id)
     if site is None:
         raise HTTPException(status_code=404, detail="Site not found")
-    await db.delete(site)
-    await db.commit()
+    try:
+        # Materials outlive their site; detaching them takes their arrivals out of the ledger
+        await db.execute(update(Material).where(Material.site_id == site_id).values(site_id=None))
+        # Balances that are back to zero go with the site. Anything else still in the
+        # ledger, or a payment, is a foreign key reference and blocks the delete
+        await db.execute(delete(models.MaterialStock).where(
+            models.MaterialStock.site_id == site_id, func.abs(models.MaterialStock.quantity) < 1e-9
+        ))
+        await db.delete(site)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Site still has payments or material movements")
+    invalidate_tables("sites", "materials")
+    site_cache.pop(site_id)
     return True
 
 ## Payments API Crud
 
+# Foreign keys are enforced, so the laborer and site must exist (404 otherwise)
+async def check_payment_references(db: AsyncSession, payment: schemas.PaymentBase) -> None:
+    if await missing_ids(db, models.Laborer, [payment.labor_id]):
+        raise HTTPException(status_code=404, detail="Laborer not found")
+    if await missing_ids(db, Site, [payment.site_id]):
+        raise HTTPException(status_code=404, detail="Site not found")
+
 async def create_payment(db: AsyncSession, payment: PaymentCreate) -> Payment:
-    new_payment = Payment(**payment.model_dump())
+    await check_payment_references(db, payment)
     try:
-        db.add(new_payment)
+        new_payment = await write_returning(db, insert(Payment).values(**payment.model_dump()), Payment)
         await db.commit()
-        await db.refresh(new_payment)
+        invalidate_tables("payments")
+        await set_payment_names(db, [new_payment])
         return new_payment
+    except IntegrityError:
+        # The laborer or site was deleted after the check
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Laborer or site no longer exists")
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail="Database error occurred")
 
-async def get_payments(db: AsyncSession, skip: int = 0, limit: int = 10) -> List[Payment]:
-    query = (
-        select(Payment)
-        .options(joinedload(Payment.labor), joinedload(Payment.site))
-        .offset(skip)
-        .limit(limit)
-    )
-    result = await db.execute(query)
-    payments = result.scalars().all()
-    
-    # Include labor_name and site_name in the response
+async def get_payments(db: AsyncSession, skip: int = 0, limit: int = 10, cursor: Optional[str] = None) -> List[Row]:
+    query = select(
+        Payment.__table__,
+        func.coalesce(models.Laborer.name, "Unknown").label("labor_name"),
+        func.coalesce(Site.name, "Unknown").label("site_name"),
+    ).outerjoin(models.Laborer, models.Laborer.id == Payment.labor_id).outerjoin(Site, Site.id == Payment.site_id)
+    result = await db.execute(paginate(query, Payment.id, skip, limit, cursor))
+    return result.all()
+
+# Include labor_name and site_name in a single payment's response, from the lookup caches
+async def set_payment_names(db: AsyncSession, payments: List[Payment]) -> None:
+    labours = await get_cached_labours(db, [payment.labor_id for payment in payments])
+    sites = await get_cached_sites(db, [payment.site_id for payment in payments])
     for payment in payments:
-        logger.info(payment)
-        payment.labor_name = payment.labor.name if payment.labor else "Unknown"
-        payment.site_name = payment.site.name if payment.site else "Unknown"
-
-    logger.info(payments)
-
-    return payments
+        payment.labor_name = labours[payment.labor_id].name if payment.labor_id in labours else "Unknown"
+        payment.site_name = sites[payment.site_id].name if payment.site_id in sites else "Unknown"
 
 
 async def get_payment(db: AsyncSession, payment_id: int) -> Payment:
     payment = await db.get(Payment, payment_id)
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
+    await set_payment_names(db, [payment])
     return payment
 
 async def update_payment(db: AsyncSession, payment_id: int, payment: PaymentUpdate) -> Payment:
-    existing_payment = await db.get(Payment, payment_id)
-    if not existing_payment:
-        raise HTTPException(status_code=404, detail="Payment not found")
-    
-    for key, value in payment.dict().items():
-        setattr(existing_payment, key, value)
-
+    await check_payment_references(db, payment)
     try:
+        existing_payment = await write_returning(
+            db, update(Payment).where(Payment.id == payment_id).values(**payment.model_dump()), Payment
+        )
+        if not existing_payment:
+            raise HTTPException(status_code=404, detail="Payment not found")
         await db.commit()
-        await db.refresh(existing_payment)
+        invalidate_tables("payments")
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Laborer or site no longer exists")
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Database error occurred")
+    await set_payment_names(db, [existing_payment])
 
     return existing_payment
 
@@ -439,3 +886,52 @@ async def delete_payment(db: AsyncSession, payment_id: int) -> None:
     
     await db.delete(existing_payment)
     await db.commit()
+    invalidate_tables("payments")
+
+## Dashboard
+
+ACTIVE_LABORER_DAYS = 30
+
+# Every KPI the dashboard shows, cached for a short TTL and dropped on any write
+async def get_dashboard_summary(db: AsyncSession, today: Optional[date] = None) -> schemas.DashboardSummary:
+    today = today or date.today()
+    summary = dashboard_cache.get(today)
+    if summary is not None:
+        return summary
+
+    total_laborers = await count_rows(db, models.Laborer)
+    active_laborers = (await db.execute(
+        select(func.count(func.distinct(Attendance.laborer_id)))
+        .where(Attendance.date > today - timedelta(days=ACTIVE_LABORER_DAYS), Attendance.date <= today, is_present)
+    )).scalar()
+    attendance_today = await get_attendance_daily(db, from_date=today, to_date=today)
+    stock = await db.execute(
+        select(
+            models.MaterialStock.site_id, Site.name, models.MaterialStock.material_name,
+            models.MaterialStock.unit, models.MaterialStock.quantity,
+        )
+        .outerjoin(Site, Site.id == models.MaterialStock.site_id)
+        .order_by(Site.name, models.MaterialStock.material_name)
+    )
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    payments_week, payments_month = (await db.execute(
+        select(
+            func.coalesce(func.sum(Payment.amount).filter(Payment.date >= week_start), 0.0),
+            func.coalesce(func.sum(Payment.amount).filter(Payment.date >= month_start), 0.0),
+        ).where(Payment.date >= min(week_start, month_start), Payment.date <= today)
+    )).one()
+
+    summary = dashboard_cache[today] = schemas.DashboardSummary(
+        as_of=today,
+        total_laborers=total_laborers,
+        active_laborers=active_laborers,
+        attendance_today=attendance_today,
+        material_stock=[
+            schemas.MaterialStock(site_id=site_id, site_name=site_name, material_name=name, unit=unit, quantity=quantity)
+            for site_id, site_name, name, unit, quantity in stock.all()
+        ],
+        payments_week=payments_week,
+        payments_month=payments_month,
+    )
+    return summary
@@ -1,30 +1,105 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import text
-from typing import AsyncGenerator
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import AsyncGenerator, Dict
 import os
 
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./labour_management.db"  # Use aiosqlite for async operations
 
-# Create async engine
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# Connection-level PRAGMAs, applied once when the pool opens a connection
+# rather than on every request session. SQLITE_PROFILE picks a set:
+#   - "balanced" (default): WAL with synchronous=NORMAL. A commit does not
+#     fsync; a power cut can lose the last few commits but never corrupts the file.
+#   - "durable": the same with synchronous=FULL, an fsync on every commit.
+#   - "minimal": WAL only, i.e. the old behaviour. Kept as a benchmark baseline.
+# SQLITE_PRAGMAS overrides single values, e.g. "cache_size=-65536,mmap_size=0".
+_BALANCED = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": "5000",  # ms to wait on a locked database instead of failing at once
+    "cache_size": "-32768",  # Negative is KiB: 32 MiB of page cache per connection
+    "mmap_size": str(256 * 1024 * 1024),
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+SQLITE_PROFILES: Dict[str, Dict[str, str]] = {
+    "balanced": _BALANCED,
+    "durable": {**_BALANCED, "synchronous": "FULL"},
+    "minimal": {"journal_mode": "WAL"},
+}
+
+def sqlite_pragmas(profile: str = "balanced", overrides: str = "") -> Dict[str, str]:
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE {profile!r}; expected one of {', '.join(SQLITE_PROFILES)}")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for item in filter(None, (part.strip() for part in overrides.split(","))):
+        name, _, value = item.partition("=")
+        pragmas[name.strip()] = value.strip()
+    return pragmas
+
+def apply_sqlite_pragmas(engine: AsyncEngine, pragmas: Dict[str, str]) -> None:
+    """Run ``pragmas`` on every new DBAPI connection of ``engine``."""
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def read_only_pragmas(pragmas: Dict[str, str]) -> Dict[str, str]:
+    """``pragmas`` for a read-only connection: journal_mode is the writer's to set
+    (changing it needs write access) and query_only refuses writes."""
+    return {**{name: value for name, value in pragmas.items() if name != "journal_mode"}, "query_only": "ON"}
+
+SQLITE_PRAGMAS = sqlite_pragmas(os.getenv("SQLITE_PROFILE", "balanced"), os.getenv("SQLITE_PRAGMAS", ""))
+
+# Create async engine. SQLAlchemy defaults aiosqlite file databases to NullPool,
+# which opens a new connection (and a new thread) per session and throws away
+# its page cache; a queue pool keeps connections, and their PRAGMAs, alive.
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=AsyncAdaptedQueuePool,
+)
+apply_sqlite_pragmas(engine, SQLITE_PRAGMAS)
 
 # Create an AsyncSession
 AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
+# Read-only engine for reports, exports and the dashboard, with its own pool so
+# long aggregate queries never take a connection the CRUD endpoints need. In WAL
+# mode readers see every committed write and never block the writer.
+def read_only_url(url: str) -> str:
+    """The same SQLite database, opened read-only through a URI filename."""
+    prefix, path = url.split(":///", 1)
+    return f"{prefix}:///file:{path}?mode=ro&uri=true"
+
+READ_DATABASE_URL = read_only_url(SQLALCHEMY_DATABASE_URL)
+READ_POOL_SIZE = int(os.getenv("READ_POOL_SIZE", "5"))
+READ_POOL_MAX_OVERFLOW = int(os.getenv("READ_POOL_MAX_OVERFLOW", "5"))
+
+read_engine = create_async_engine(
+    READ_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=READ_POOL_SIZE,
+    max_overflow=READ_POOL_MAX_OVERFLOW,
+)
+apply_sqlite_pragmas(read_engine, read_only_pragmas(SQLITE_PRAGMAS))
+
+ReadSessionLocal = sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
+
 # Base model for declarative classes
 Base = declarative_base()
 
-async def enable_wal_mode(db: AsyncSession):
-    """Enable Write-Ahead Logging mode for SQLite."""
-    await db.execute(text("PRAGMA journal_mode=WAL;"))
-
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """Dependency that provides a database session for request handlers."""
     async with AsyncSessionLocal() as db:
-        await enable_wal_mode(db)  # Enable WAL mode on session start
         try:
             yield db  # Yield the session for use in route handlers
             await db.commit()  # Commit changes if everything goes well
@@ -36,3 +111,12 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await db.rollback()  # Roll back for any other exceptions
             print(f"Unexpected error: {e}")  # Log the error
             raise e  # Re-raise the exception for further handling in route handlers
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency that provides a read-only session for reporting endpoints."""
+    async with ReadSessionLocal() as db:
+        try:
+            yield db
+        except SQLAlchemyError as e:
+            print(f"Database error: {e}")
+            raise e
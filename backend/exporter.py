@@ -0,0 +1,219 @@
+import csv
+import enum
+import io
+import json
+from datetime import date
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, types
+
+from backend import models
+from backend.database import ReadSessionLocal
+
+try:  # Parquet needs pyarrow (in requirements.txt); a setup without it still serves CSV and NDJSON
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Streaming exports. Rows are pulled from a server-side cursor in batches of
+# EXPORT_BATCH_SIZE and encoded as they arrive, so the server never holds more
+# than one batch whatever the date range.
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _attendance_query(from_date: Optional[date], to_date: Optional[date], site: Optional[str], site_id: Optional[int]):
+    query = (
+        select(
+            models.Attendance.id,
+            models.Attendance.laborer_id,
+            models.Laborer.name.label("laborer_name"),
+            models.Attendance.date,
+            models.Attendance.present,
+            models.Attendance.hours_worked,
+            models.Attendance.site_name,
+        )
+        .join(models.Laborer, models.Laborer.id == models.Attendance.laborer_id)
+        .order_by(models.Attendance.date, models.Attendance.id)
+    )
+    if site is not None:
+        query = query.where(models.Attendance.site_name == site)
+    return _date_range(query, models.Attendance.date, from_date, to_date)
+
+
+def _payments_query(from_date: Optional[date], to_date: Optional[date], site: Optional[str], site_id: Optional[int]):
+    query = (
+        select(
+            models.Payment.id,
+            models.Payment.date,
+            models.Payment.amount,
+            models.Payment.labor_id,
+            models.Laborer.name.label("labor_name"),
+            models.Payment.site_id,
+            models.Site.name.label("site_name"),
+            models.Payment.material_name,
+            models.Payment.description,
+        )
+        .outerjoin(models.Laborer, models.Laborer.id == models.Payment.labor_id)
+        .outerjoin(models.Site, models.Site.id == models.Payment.site_id)
+        .order_by(models.Payment.date, models.Payment.id)
+    )
+    query = _site_filter(query, models.Payment.site_id, site, site_id)
+    return _date_range(query, models.Payment.date, from_date, to_date)
+
+
+def _materials_query(from_date: Optional[date], to_date: Optional[date], site: Optional[str], site_id: Optional[int]):
+    query = (
+        select(
+            models.Material.id,
+            models.Material.name,
+            models.Material.quantity,
+            models.Material.unit,
+            models.Material.site_id,
+            models.Site.name.label("site_name"),
+            models.Material.arrival_date,
+            models.Material.transport_type,
+        )
+        .outerjoin(models.Site, models.Site.id == models.Material.site_id)
+        .order_by(models.Material.arrival_date, models.Material.id)
+    )
+    query = _site_filter(query, models.Material.site_id, site, site_id)
+    return _date_range(query, models.Material.arrival_date, from_date, to_date)
+
+
+def _date_range(query, column, from_date: Optional[date], to_date: Optional[date]):
+    if from_date is not None:
+        query = query.where(column >= from_date)
+    if to_date is not None:
+        query = query.where(column <= to_date)
+    return query
+
+
+def _site_filter(query, column, site: Optional[str], site_id: Optional[int]):
+    if site_id is not None:
+        query = query.where(column == site_id)
+    if site is not None:
+        query = query.where(models.Site.name == site)
+    return query
+
+
+EXPORTS: Dict[str, Callable] = {
+    "attendance": _attendance_query,
+    "payments": _payments_query,
+    "materials": _materials_query,
+}
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _encode_csv(columns: List[str], rows, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(columns: List[str], rows) -> bytes:
+    return "".join(
+        json.dumps({column: _plain(value) for column, value in zip(columns, row)}) + "\n" for row in rows
+    ).encode("utf-8")
+
+
+def _arrow_schema(query):
+    # Fixed column types, so a batch where a column happens to be all NULL still matches
+    def arrow_type(column_type):
+        if isinstance(column_type, types.Integer):
+            return pyarrow.int64()
+        if isinstance(column_type, types.Float):
+            return pyarrow.float64()
+        if isinstance(column_type, types.Date):
+            return pyarrow.date32()
+        return pyarrow.string()
+
+    return pyarrow.schema([(column.name, arrow_type(column.type)) for column in query.selected_columns])
+
+
+def _arrow_value(value):
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+class _ParquetSink(io.RawIOBase):
+    """Write-only file that hands ParquetWriter's output back batch by batch."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def stream_export(
+    entity: str,
+    fmt: str,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    site: Optional[str] = None,
+    site_id: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Validate the request, then return an async iterator of encoded chunks."""
+    if entity not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{entity}'")
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format must be csv, ndjson or parquet")
+    if fmt == "parquet" and pyarrow is None:
+        raise HTTPException(status_code=400, detail="Parquet export needs pyarrow installed on the server")
+    query = EXPORTS[entity](from_date, to_date, site, site_id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    return _generate(query, fmt)
+
+
+async def _generate(query, fmt: str) -> AsyncIterator[bytes]:
+    # The request's session is closed before a streaming body is sent, so the
+    # export opens its own, read-only one, for as long as the response is being written.
+    async with ReadSessionLocal() as db:
+        result = await db.stream(query)
+        columns = list(result.keys())
+        if fmt == "parquet":
+            schema = _arrow_schema(query)
+            sink = _ParquetSink()
+            writer = pyarrow.parquet.ParquetWriter(sink, schema)
+
+        first = True
+        async for rows in result.partitions():
+            if fmt == "csv":
+                yield _encode_csv(columns, rows, header=first)
+            elif fmt == "ndjson":
+                yield _encode_ndjson(columns, rows)
+            else:
+                batch = [dict(zip(columns, map(_arrow_value, row))) for row in rows]
+                writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+                yield sink.drain()
+            first = False
+
+        if fmt == "csv" and first:
+            yield _encode_csv(columns, [], header=True)  # Empty export still gets a header
+        if fmt == "parquet":
+            writer.close()  # Writes the footer
+            yield sink.drain()
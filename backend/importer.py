@@ -0,0 +1,177 @@
+import asyncio
+import codecs
+import csv
+import io
+import json
+import logging
+from itertools import islice
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import models, schemas
+from backend.cache import invalidate_tables
+
+logger = logging.getLogger(__name__)
+
+# Bulk import of CSV / NDJSON uploads. The upload is read record by record and
+# handled in chunks: each chunk is validated with the entity's Create schema,
+# checked against the referenced tables with one IN query per reference, then
+# inserted with a single executemany and committed. Memory stays bounded by the
+# chunk size whatever the upload size.
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_ENTITIES = {
+    "labours": (schemas.LaborerCreate, models.Laborer),
+    "materials": (schemas.MaterialCreate, models.Material),
+    "sites": (schemas.SiteCreate, models.Site),
+    "payments": (schemas.PaymentCreate, models.Payment),
+}
+
+# Foreign keys to check before insert: field -> referenced model
+IMPORT_REFERENCES = {
+    "materials": {"site_id": models.Site},
+    "payments": {"labor_id": models.Laborer, "site_id": models.Site},
+}
+
+Record = Tuple[int, Optional[dict], Optional[str]]  # (row number, fields, parse error)
+
+
+def _csv_records(stream: BinaryIO) -> Iterator[Record]:
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    for row_number, row in enumerate(reader, start=1):
+        if None in row:
+            yield row_number, None, "More values than header columns"
+            continue
+        # Empty cells mean "not given", so optional fields fall back to their defaults
+        yield row_number, {key: value for key, value in row.items() if value not in ("", None)}, None
+
+
+def _ndjson_records(stream: BinaryIO) -> Iterator[Record]:
+    row_number = 0
+    for line in codecs.getreader("utf-8-sig")(stream):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            fields = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(fields, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, fields, None
+
+
+def _format_errors(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in error.errors()]
+
+
+class _ImportProgress:
+    def __init__(self, entity: str):
+        self.entity = entity
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[schemas.ImportRowError] = []
+
+    def fail(self, row: int, errors: List[str]):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(schemas.ImportRowError(row=row, errors=errors))
+
+    def result(self) -> schemas.ImportReport:
+        return schemas.ImportReport(
+            entity=self.entity, imported=self.imported, failed=self.failed,
+            errors=sorted(self.errors, key=lambda error: error.row)
+        )
+
+
+async def _existing_ids(db: AsyncSession, model, ids: set) -> set:
+    if not ids:
+        return set()
+    result = await db.execute(select(model.id).where(model.id.in_(ids)))
+    return set(result.scalars().all())
+
+
+async def _import_chunk(db: AsyncSession, entity: str, records: List[Record], report: _ImportProgress):
+    create_schema, model = IMPORT_ENTITIES[entity]
+
+    valid: List[Tuple[int, dict]] = []
+    for row_number, fields, parse_error in records:
+        if parse_error:
+            report.fail(row_number, [parse_error])
+            continue
+        try:
+            valid.append((row_number, create_schema.model_validate(fields).model_dump()))
+        except ValidationError as e:
+            report.fail(row_number, _format_errors(e))
+
+    # Reject rows pointing at laborers or sites that do not exist
+    for field, referenced in IMPORT_REFERENCES.get(entity, {}).items():
+        known = await _existing_ids(db, referenced, {values[field] for _, values in valid})
+        checked = []
+        for row_number, values in valid:
+            if values[field] in known:
+                checked.append((row_number, values))
+            else:
+                report.fail(row_number, [f"{field}: {referenced.__tablename__} {values[field]} not found"])
+        valid = checked
+
+    # Site names are unique, both against the database and within the upload
+    if entity == "sites" and valid:
+        result = await db.execute(
+            select(models.Site.name).where(models.Site.name.in_({values["name"] for _, values in valid}))
+        )
+        taken = set(result.scalars().all())
+        unique = []
+        for row_number, values in valid:
+            if values["name"] in taken:
+                report.fail(row_number, [f"name: site '{values['name']}' already exists"])
+            else:
+                taken.add(values["name"])
+                unique.append((row_number, values))
+        valid = unique
+
+    if not valid:
+        return
+    try:
+        await db.execute(insert(model), [values for _, values in valid])
+        await db.commit()
+    except SQLAlchemyError as e:
+        logger.error(f"Database error occurred while importing {entity}: {e}")
+        await db.rollback()
+        for row_number, _ in valid:
+            report.fail(row_number, ["Database error occurred"])
+        return
+    report.imported += len(valid)
+
+
+async def import_rows(db: AsyncSession, entity: str, stream: BinaryIO, fmt: str) -> schemas.ImportReport:
+    """Import every record of a CSV or NDJSON stream into ``entity``'s table."""
+    if entity not in IMPORT_ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown import entity '{entity}'")
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Format must be csv or ndjson")
+
+    records = _csv_records(stream) if fmt == "csv" else _ndjson_records(stream)
+    report = _ImportProgress(entity)
+    try:
+        while True:
+            # Parsing reads the spooled upload from disk, so keep it off the event loop
+            chunk = await asyncio.to_thread(lambda: list(islice(records, IMPORT_CHUNK_SIZE)))
+            if not chunk:
+                break
+            await _import_chunk(db, entity, chunk, report)
+    except (UnicodeDecodeError, csv.Error) as e:
+        # The rest of the upload is unreadable; report it and keep what was already imported
+        report.fail(report.imported + report.failed + 1, [f"Could not parse upload: {e}"])
+    finally:
+        if report.imported:
+            invalidate_tables(IMPORT_ENTITIES[entity][1].__tablename__)
+    return report.result()
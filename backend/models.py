@@ -1,8 +1,11 @@
 import enum
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Float,Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Float,Enum, Index, event, text, table, column
 from sqlalchemy.orm import relationship
 from backend.database import Base
 from pydantic import BaseModel
+import logging
+
+logger = logging.getLogger(__name__)
 
 class Laborer(Base):
     __tablename__ = 'laborers'
@@ -17,6 +20,44 @@ class Laborer(Base):
     attendance_records = relationship("Attendance", back_populates="laborer",cascade="all, delete-orphan")
     payments = relationship("Payment", back_populates="labor")
 
+# FTS5 shadow index over laborer names, used by the labour search endpoint.
+# It is an external-content table: the text lives in `laborers` and the
+# triggers below keep the index in step with every insert, update and delete.
+laborers_fts = table("laborers_fts", column("rowid"), column("rank"))
+
+LABORERS_FTS_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS laborers_fts_ai AFTER INSERT ON laborers BEGIN
+        INSERT INTO laborers_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS laborers_fts_ad AFTER DELETE ON laborers BEGIN
+        INSERT INTO laborers_fts(laborers_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS laborers_fts_au AFTER UPDATE OF name ON laborers BEGIN
+        INSERT INTO laborers_fts(laborers_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO laborers_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+]
+
+@event.listens_for(Base.metadata, "after_create")
+def create_laborers_fts(target, connection, **kw):
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'laborers_fts'")
+    ).first()
+    if not exists:
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE laborers_fts USING fts5("
+            "name, content='laborers', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ))
+        # Index the laborers that were added before the search table existed
+        connection.execute(text("INSERT INTO laborers_fts(laborers_fts) VALUES ('rebuild')"))
+    for statement in LABORERS_FTS_DDL:
+        connection.execute(text(statement))
+
+@event.listens_for(Base.metadata, "before_drop")
+def drop_laborers_fts(target, connection, **kw):
+    connection.execute(text("DROP TABLE IF EXISTS laborers_fts"))
+
 class Attendance(Base):
     __tablename__ = 'attendance'
 
@@ -29,11 +70,118 @@ class Attendance(Base):
 
     laborer = relationship("Laborer", back_populates="attendance_records") 
 
+    __table_args__ = (
+        # One mark per laborer per day; also the conflict target for the attendance upsert
+        Index("ux_attendance_laborer_date", "laborer_id", "date", unique=True),
+        Index("ix_attendance_date", "date"),
+        Index("ix_attendance_site_date", "site_name", "date"),
+    )
+
+@event.listens_for(Base.metadata, "after_create")
+def create_missing_indexes(target, connection, **kw):
+    # create_all skips indexes of tables that already exist, so add them here.
+    unique_exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_attendance_laborer_date'")
+    ).first()
+    if not unique_exists:
+        # Older databases may hold retried duplicates; keep the latest mark of each day
+        removed = connection.execute(text(
+            "DELETE FROM attendance WHERE id NOT IN "
+            "(SELECT MAX(id) FROM attendance GROUP BY laborer_id, date)"
+        )).rowcount
+        if removed:
+            logger.warning(f"Removed {removed} duplicate attendance rows before adding the unique index")
+    for tbl in target.sorted_tables:
+        for index in tbl.indexes:
+            index.create(connection, checkfirst=True)
+
+# Attendance values that count as a present day. The UI records "Present"/"Absent";
+# older clients sent "Yes"/"No".
+PRESENT_MARKS = ("present", "yes", "true", "1")
+
+# Daily headcount and hours per site, maintained by triggers on `attendance`
+# so every insert, upsert, update and delete adjusts it in the same transaction.
+class AttendanceDaily(Base):
+    __tablename__ = 'attendance_daily'
+
+    site_name = Column(String, primary_key=True)  # '' for marks recorded without a site
+    date = Column(Date, primary_key=True)
+    present_count = Column(Integer, nullable=False, default=0)
+    absent_count = Column(Integer, nullable=False, default=0)
+    total_hours = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        Index("ix_attendance_daily_date", "date"),
+    )
+
+_PRESENT_SQL = "(lower(COALESCE({row}.present, '')) IN (" + ", ".join(f"'{mark}'" for mark in PRESENT_MARKS) + "))"
+
+def _rollup_add(row: str, sign: str) -> str:
+    present = _PRESENT_SQL.format(row=row)
+    return f"""INSERT INTO attendance_daily (site_name, date, present_count, absent_count, total_hours)
+        SELECT COALESCE({row}.site_name, ''), {row}.date, {sign}{present}, {sign}(NOT {present}),
+               {sign}COALESCE({row}.hours_worked, 0)
+        WHERE {row}.date IS NOT NULL
+        ON CONFLICT (site_name, date) DO UPDATE SET
+            present_count = present_count + excluded.present_count,
+            absent_count = absent_count + excluded.absent_count,
+            total_hours = total_hours + excluded.total_hours;"""
+
+_ROLLUP_PRUNE = """DELETE FROM attendance_daily
+        WHERE site_name = COALESCE(old.site_name, '') AND date = old.date
+          AND present_count = 0 AND absent_count = 0;"""
+
+ATTENDANCE_DAILY_DDL = [
+    f"""CREATE TRIGGER IF NOT EXISTS attendance_daily_ai AFTER INSERT ON attendance BEGIN
+        {_rollup_add("new", "")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS attendance_daily_ad AFTER DELETE ON attendance BEGIN
+        {_rollup_add("old", "-")}
+        {_ROLLUP_PRUNE}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS attendance_daily_au AFTER UPDATE ON attendance BEGIN
+        {_rollup_add("old", "-")}
+        {_ROLLUP_PRUNE}
+        {_rollup_add("new", "")}
+    END""",
+]
+
+# Regenerate the rollup from the raw attendance rows
+ATTENDANCE_DAILY_REBUILD = [
+    "DELETE FROM attendance_daily",
+    f"""INSERT INTO attendance_daily (site_name, date, present_count, absent_count, total_hours)
+        SELECT COALESCE(site_name, ''), date,
+               SUM({_PRESENT_SQL.format(row="attendance")}),
+               SUM(NOT {_PRESENT_SQL.format(row="attendance")}),
+               COALESCE(SUM(hours_worked), 0)
+        FROM attendance
+        WHERE date IS NOT NULL
+        GROUP BY COALESCE(site_name, ''), date""",
+]
+
+@event.listens_for(Base.metadata, "after_create")
+def create_attendance_daily(target, connection, **kw):
+    if AttendanceDaily.__table__ in kw.get("tables", ()):
+        # New rollup table on an existing database: backfill it once
+        for statement in ATTENDANCE_DAILY_REBUILD:
+            connection.execute(text(statement))
+    for statement in ATTENDANCE_DAILY_DDL:
+        connection.execute(text(statement))
+
 # Pydantic model for login
 class LoginRequest(BaseModel):
     username: str
     password: str
 
+# Admin login sessions, shared by every worker process. Only a hash of the
+# cookie value is stored, so a copy of the database cannot be used to log in.
+class AdminSession(Base):
+    __tablename__ = "admin_sessions"
+
+    token_hash = Column(String, primary_key=True)
+    username = Column(String, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)  # Unix time
+
 
 # Material Inventory Codes
 
@@ -87,13 +235,117 @@ class Site(Base):
     payments = relationship("Payment", back_populates="site")
 
 
+# Material stock ledger. Every change to a site's stock is a movement; arrivals
+# are mirrored from `materials` rows, consumption and transfers are recorded
+# directly. `material_stock` holds the running balance per (site, material,
+# unit) and is adjusted by triggers in the same transaction as each movement.
+class MovementType(enum.Enum):
+    arrival = "arrival"
+    consumption = "consumption"
+    transfer = "transfer"
+
+class MaterialMovement(Base):
+    __tablename__ = "material_movements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    material_id = Column(Integer, ForeignKey("materials.id"), nullable=True, index=True)  # Set for arrivals
+    site_id = Column(Integer, ForeignKey("sites.id"), nullable=False)  # Source site for transfers
+    to_site_id = Column(Integer, ForeignKey("sites.id"), nullable=True)  # Destination for transfers
+    material_name = Column(String, nullable=False)
+    unit = Column(Enum(UnitType), nullable=False)
+    quantity = Column(Float, nullable=False)
+    movement_type = Column(Enum(MovementType), nullable=False)
+    date = Column(Date, nullable=False)
+    note = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_material_movements_site_date", "site_id", "date"),
+    )
+
+class MaterialStock(Base):
+    __tablename__ = "material_stock"
+
+    site_id = Column(Integer, ForeignKey("sites.id"), primary_key=True)
+    material_name = Column(String, primary_key=True)
+    unit = Column(Enum(UnitType), primary_key=True)
+    quantity = Column(Float, nullable=False, default=0.0)
+
+def _stock_add(site: str, row: str, amount: str) -> str:
+    return f"""INSERT INTO material_stock (site_id, material_name, unit, quantity)
+        SELECT {site}, {row}.material_name, {row}.unit, {amount}
+        WHERE {site} IS NOT NULL
+        ON CONFLICT (site_id, material_name, unit) DO UPDATE SET quantity = quantity + excluded.quantity;"""
+
+def _stock_apply(row: str, sign: str) -> str:
+    # Arrivals add to the site; consumption and transfers draw from it; transfers add to the destination
+    source = f"{sign}(CASE {row}.movement_type WHEN 'arrival' THEN {row}.quantity ELSE -{row}.quantity END)"
+    return _stock_add(f"{row}.site_id", row, source) + "\n        " + _stock_add(f"{row}.to_site_id", row, f"{sign}{row}.quantity")
+
+_ARRIVAL_FROM_MATERIAL = """INSERT INTO material_movements
+            (material_id, site_id, material_name, unit, quantity, movement_type, date)
+        SELECT new.id, new.site_id, new.name, new.unit, new.quantity, 'arrival', new.arrival_date
+        WHERE new.site_id IS NOT NULL AND new.name IS NOT NULL;"""
+
+MATERIAL_STOCK_DDL = [
+    f"""CREATE TRIGGER IF NOT EXISTS material_stock_ai AFTER INSERT ON material_movements BEGIN
+        {_stock_apply("new", "")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS material_stock_ad AFTER DELETE ON material_movements BEGIN
+        {_stock_apply("old", "-")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS material_stock_au AFTER UPDATE ON material_movements BEGIN
+        {_stock_apply("old", "-")}
+        {_stock_apply("new", "")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS material_arrival_ai AFTER INSERT ON materials BEGIN
+        {_ARRIVAL_FROM_MATERIAL}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS material_arrival_au AFTER UPDATE ON materials BEGIN
+        DELETE FROM material_movements WHERE material_id = old.id;
+        {_ARRIVAL_FROM_MATERIAL}
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS material_arrival_ad AFTER DELETE ON materials BEGIN
+        DELETE FROM material_movements WHERE material_id = old.id;
+    END""",
+]
+
+# Regenerate balances from the movement ledger
+MATERIAL_STOCK_REBUILD = [
+    "DELETE FROM material_stock",
+    """INSERT INTO material_stock (site_id, material_name, unit, quantity)
+        SELECT site_id, material_name, unit, SUM(quantity) FROM (
+            SELECT site_id, material_name, unit,
+                   CASE movement_type WHEN 'arrival' THEN quantity ELSE -quantity END AS quantity
+            FROM material_movements
+            UNION ALL
+            SELECT to_site_id, material_name, unit, quantity
+            FROM material_movements WHERE to_site_id IS NOT NULL
+        )
+        GROUP BY site_id, material_name, unit""",
+]
+
+@event.listens_for(Base.metadata, "after_create")
+def create_material_stock(target, connection, **kw):
+    if MaterialMovement.__table__ in kw.get("tables", ()):
+        # New ledger on an existing database: every material row so far is an arrival
+        connection.execute(text(
+            "INSERT INTO material_movements (material_id, site_id, material_name, unit, quantity, movement_type, date) "
+            "SELECT id, site_id, name, unit, quantity, 'arrival', arrival_date FROM materials "
+            "WHERE site_id IS NOT NULL AND name IS NOT NULL"
+        ))
+        for statement in MATERIAL_STOCK_REBUILD:
+            connection.execute(text(statement))
+    for statement in MATERIAL_STOCK_DDL:
+        connection.execute(text(statement))
+
+
 # Payment Model
 class Payment(Base):
     __tablename__ = "payments"
 
     id = Column(Integer, primary_key=True, index=True)
     amount = Column(Float, nullable=False)
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, index=True)
     labor_id = Column(Integer, ForeignKey("laborers.id"), nullable=False)
     site_id = Column(Integer, ForeignKey("sites.id"), nullable=False)
     material_name =  Column(String,nullable=True)
@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from backend.assets import AssetPipeline, assets, etag_matches
+
+# HTML pages served from memory. Each page is read once, then re-read only
+# when its mtime changes; the file is stat'ed at most once per
+# PAGE_CHECK_INTERVAL seconds, off the event loop. Responses carry a strong
+# ETag and Last-Modified so browsers revalidate with a 304 instead of
+# downloading the page again.
+FRONTEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "frontend"))
+PAGE_CHECK_INTERVAL = float(os.getenv("PAGE_CHECK_INTERVAL", "1"))
+
+PAGES = (
+    "login.html",
+    "dashboard.html",
+    "labor-management.html",
+    "inventory-management.html",
+    "payment-management.html",
+)
+
+
+@dataclass
+class Page:
+    body: bytes
+    etag: str
+    last_modified: str
+    mtime: float  # Whole seconds, as compared against If-Modified-Since
+    mtime_ns: int
+    size: int
+    checked_at: float
+
+
+def _read_page(path: str, pipeline: Optional[AssetPipeline] = None) -> Page:
+    with open(path, "rb") as file:
+        stat = os.fstat(file.fileno())
+        body = file.read()
+    mtime = stat.st_mtime
+    if pipeline is not None:
+        # The page changes whenever an asset it references does
+        body = pipeline.rewrite_html(body)
+        mtime = max(mtime, pipeline.mtime)
+    return Page(
+        body=body,
+        etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+        last_modified=formatdate(mtime, usegmt=True),
+        mtime=int(mtime),
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        checked_at=time.monotonic(),
+    )
+
+
+class PageCache:
+    def __init__(
+        self,
+        directory: str = FRONTEND_DIR,
+        check_interval: float = PAGE_CHECK_INTERVAL,
+        pipeline: Optional[AssetPipeline] = None,
+    ):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.pipeline = pipeline  # Rewrites asset references to fingerprinted URLs
+        self._pages: Dict[str, Page] = {}
+
+    async def preload(self, *names: str) -> None:
+        for name in names or PAGES:
+            await self.get(name)
+
+    async def get(self, name: str) -> Page:
+        page = self._pages.get(name)
+        if page is not None and time.monotonic() - page.checked_at < self.check_interval:
+            return page
+
+        path = os.path.join(self.directory, name)
+        if page is not None:
+            stat = await asyncio.to_thread(os.stat, path)
+            if (stat.st_mtime_ns, stat.st_size) == (page.mtime_ns, page.size):
+                page.checked_at = time.monotonic()
+                return page
+
+        page = self._pages[name] = await asyncio.to_thread(_read_page, path, self.pipeline)
+        return page
+
+    async def response(self, request: Request, name: str) -> Response:
+        page = await self.get(name)
+        headers = {
+            "ETag": page.etag,
+            "Last-Modified": page.last_modified,
+            "Cache-Control": "no-cache",  # Always revalidate; a match costs only a 304
+        }
+        if _not_modified(request, page):
+            return Response(status_code=304, headers=headers)
+        return Response(page.body, media_type="text/html; charset=utf-8", headers=headers)
+
+
+def _not_modified(request: Request, page: Page) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+        return etag_matches(if_none_match, page.etag)
+
+    if_modified_since = _parse_http_date(request.headers.get("if-modified-since"))
+    return if_modified_since is not None and page.mtime <= if_modified_since
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+pages = PageCache(pipeline=assets)
@@ -0,0 +1,76 @@
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Optional, Sequence
+
+from fastapi import HTTPException
+
+
+# Opaque keyset cursors for the list endpoints. A cursor wraps the key of the
+# last row of a page, so the next page is a range seek on an index instead of
+# an OFFSET that has to walk every earlier row.
+
+def _encode(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return payload
+
+
+def encode_cursor(last_id: int) -> str:
+    return _encode({"id": last_id})
+
+
+def decode_cursor(cursor: str) -> int:
+    last_id = _decode(cursor).get("id")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
+
+
+def encode_date_cursor(last_date: date) -> str:
+    return _encode({"date": last_date.isoformat()})
+
+
+def decode_date_cursor(cursor: str) -> date:
+    try:
+        return date.fromisoformat(_decode(cursor)["date"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query, id_column, skip: int = 0, limit: int = 10, cursor: Optional[str] = None):
+    """Apply keyset pagination when a cursor is given, offset pagination otherwise."""
+    query = query.order_by(id_column)
+    if cursor:
+        return query.where(id_column > decode_cursor(cursor)).limit(limit)
+    return query.offset(skip).limit(limit)
+
+
+def _last_value(rows: Sequence, limit: int, key: str):
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return last[key] if isinstance(last, dict) else getattr(last, key)
+
+
+def next_cursor(rows: Sequence, limit: int) -> Optional[str]:
+    """Cursor for the page after ``rows``, or None once a short page is returned."""
+    last_id = _last_value(rows, limit, "id")
+    return encode_cursor(last_id) if last_id is not None else None
+
+
+def next_date_cursor(rows: Sequence, limit: int) -> Optional[str]:
+    """Date-keyed variant of next_cursor for per-laborer attendance history."""
+    last_date = _last_value(rows, limit, "date")
+    return encode_date_cursor(last_date) if last_date is not None else None
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date
-from backend.models import UnitType
+from backend.models import UnitType, MovementType
 from typing import List, Optional
 
 class LaborerBase(BaseModel):
@@ -54,10 +54,60 @@ class Attendance(AttendanceBase):
     class Config:
         from_attributes = True
 
+# Totals for one laborer over a date range, computed in SQL
+class AttendanceSummary(BaseModel):
+    laborer_id: int
+    from_date: Optional[date] = None
+    to_date: Optional[date] = None
+    days_present: int
+    days_absent: int
+    hours_worked: float
+
+# One row of the per-site daily attendance rollup
+class AttendanceDaily(BaseModel):
+    site_name: str
+    date: date
+    present_count: int
+    absent_count: int
+    total_hours: float
+
+    class Config:
+        from_attributes = True
+
+# Payroll sheet: wages owed per laborer over a date range
+class PayrollEntry(BaseModel):
+    laborer_id: int
+    laborer_name: str
+    daily_wage: float
+    days_present: int
+    hours_worked: float
+    payable_days: float  # Present days pro-rated by hours worked against a standard shift
+    amount: float
+
+class PayrollSheet(BaseModel):
+    site_name: Optional[str] = None
+    from_date: date
+    to_date: date
+    shift_hours: float
+    entries: List[PayrollEntry]
+    total_amount: float
+
+# Bulk roll-call: one site and date, one mark per laborer
+class AttendanceMark(BaseModel):
+    laborer_id: int
+    present: str
+    hours_worked: float
+
+class AttendanceBulkCreate(BaseModel):
+    site_name: str
+    date: date
+    marks: List[AttendanceMark]
+
 class AttendanceResponse(BaseModel):
     results: List[Attendance]  # This can be an empty list
     next: Optional[int] = None
     prev: Optional[int] = None
+    next_cursor: Optional[str] = None  # Opaque keyset cursor for the following page
     total: int
 
 ## Material Inventory Codes
@@ -69,7 +119,7 @@ class MaterialBase(BaseModel):
     unit: UnitType
     site_id: int
     arrival_date: date
-    transport_type: Optional[str]  # Optional field for transport type
+    transport_type: Optional[str] = None  # Optional field for transport type
 
 class MaterialCreate(MaterialBase):
     pass
@@ -84,6 +134,45 @@ class Material(MaterialBase):
     class Config:
         from_attributes = True
 
+# Material stock ledger
+class MaterialMovementCreate(BaseModel):
+    site_id: int  # Site the stock is drawn from
+    material_name: str
+    unit: UnitType
+    quantity: float
+    movement_type: MovementType  # consumption or transfer; arrivals are recorded through /materials/
+    date: date
+    to_site_id: Optional[int] = None  # Required for transfers
+    note: Optional[str] = None
+
+class MaterialMovement(MaterialMovementCreate):
+    id: int
+    material_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+class SiteStock(BaseModel):
+    site_id: int
+    material_name: str
+    unit: UnitType
+    quantity: float
+
+    class Config:
+        from_attributes = True
+
+# Material totals in a canonical unit per dimension (mass in kg, volume in liters, ...).
+# Units with no known conversion are reported as-is with the unit as the dimension.
+class MaterialTotal(BaseModel):
+    material_name: str
+    dimension: str
+    unit: UnitType
+    quantity: float
+
+class MaterialSummary(BaseModel):
+    site_id: Optional[int] = None
+    totals: List[MaterialTotal]
+
 # Site Schema
 class SiteBase(BaseModel):
     name: str
@@ -131,4 +220,31 @@ class PaginatedMaterialsResponse(BaseModel):
     prev: Optional[int] = None
 
 
+# Dashboard KPIs
+class MaterialStock(BaseModel):
+    site_id: Optional[int] = None
+    site_name: Optional[str] = None
+    material_name: str
+    unit: UnitType
+    quantity: float
 
+class DashboardSummary(BaseModel):
+    as_of: date
+    total_laborers: int
+    active_laborers: int  # Laborers marked present in the last ACTIVE_LABORER_DAYS days
+    attendance_today: List[AttendanceDaily]
+    material_stock: List[MaterialStock]
+    payments_week: float  # Since Monday
+    payments_month: float  # Since the 1st
+
+
+# Bulk import report
+class ImportRowError(BaseModel):
+    row: int  # 1-based record number in the upload
+    errors: List[str]
+
+class ImportReport(BaseModel):
+    entity: str
+    imported: int
+    failed: int
+    errors: List[ImportRowError]  # First errors only; `failed` has the full count
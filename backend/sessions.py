@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from sqlalchemy import delete
+from sqlalchemy.exc import SQLAlchemyError
+
+from backend import models
+from backend.cache import StatsCache
+from backend.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Admin sessions that every uvicorn worker can see. SESSION_BACKEND picks the
+# store: "sqlite" keeps sessions in the admin_sessions table behind a short
+# in-memory cache, "signed" issues stateless tokens signed with SESSION_SECRET.
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(12 * 60 * 60)))  # Seconds a login stays valid
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "600"))
+# How long a worker trusts its cached copy of a session; bounds how late it
+# notices a logout made on another worker
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "30"))
+
+
+class SessionStore(ABC):
+    """Maps a session cookie to the logged-in username."""
+
+    @abstractmethod
+    async def create(self, username: str) -> str:
+        """Start a session for ``username``; returns the token for the cookie."""
+
+    @abstractmethod
+    async def get(self, token: Optional[str]) -> Optional[str]:
+        """The username of a live session, or None."""
+
+    @abstractmethod
+    async def delete(self, token: Optional[str]) -> None:
+        """End the session, if there is one."""
+
+    async def sweep(self) -> int:
+        """Remove expired sessions; returns how many were removed."""
+        return 0
+
+    async def run_sweeper(self, interval: float = SESSION_SWEEP_INTERVAL) -> None:
+        while True:
+            try:
+                removed = await self.sweep()
+                if removed:
+                    logger.info(f"Swept {removed} expired sessions")
+            except SQLAlchemyError as e:
+                logger.error(f"Database error occurred while sweeping sessions: {e}")
+            await asyncio.sleep(interval)
+
+
+class SQLiteSessionStore(SessionStore):
+    def __init__(self, session_factory=AsyncSessionLocal, ttl: int = SESSION_TTL, cache_ttl: float = SESSION_CACHE_TTL):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.cache = StatsCache("sessions", maxsize=10000, ttl=cache_ttl)
+
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    async def create(self, username: str) -> str:
+        token = secrets.token_hex(32)
+        token_hash = self._hash(token)
+        expires_at = time.time() + self.ttl
+        async with self.session_factory() as db:
+            db.add(models.AdminSession(token_hash=token_hash, username=username, expires_at=expires_at))
+            await db.commit()
+        self.cache[token_hash] = (username, expires_at)
+        return token
+
+    async def get(self, token: Optional[str]) -> Optional[str]:
+        if not token:
+            return None
+        token_hash = self._hash(token)
+        cached = self.cache.get(token_hash)
+        if cached is None:
+            async with self.session_factory() as db:
+                row = await db.get(models.AdminSession, token_hash)
+                if row is None:
+                    return None
+                cached = self.cache[token_hash] = (row.username, row.expires_at)
+        username, expires_at = cached
+        if expires_at <= time.time():
+            self.cache.pop(token_hash)
+            return None
+        return username
+
+    async def delete(self, token: Optional[str]) -> None:
+        if not token:
+            return
+        token_hash = self._hash(token)
+        self.cache.pop(token_hash)
+        async with self.session_factory() as db:
+            await db.execute(delete(models.AdminSession).where(models.AdminSession.token_hash == token_hash))
+            await db.commit()
+
+    async def sweep(self) -> int:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(models.AdminSession).where(models.AdminSession.expires_at <= time.time())
+            )
+            await db.commit()
+            return result.rowcount
+
+
+class SignedTokenStore(SessionStore):
+    """Stateless tokens: nothing to store or sweep, but a logout cannot revoke a copied token."""
+
+    def __init__(self, secret: Optional[str] = None, ttl: int = SESSION_TTL):
+        if not secret:
+            logger.warning("SESSION_SECRET is not set; signed sessions will not survive a restart or span workers")
+            secret = secrets.token_hex(32)
+        self.serializer = URLSafeTimedSerializer(secret, salt="admin-session")
+        self.ttl = ttl
+
+    async def create(self, username: str) -> str:
+        return self.serializer.dumps({"u": username})
+
+    async def get(self, token: Optional[str]) -> Optional[str]:
+        if not token:
+            return None
+        try:
+            return self.serializer.loads(token, max_age=self.ttl)["u"]
+        except (SignatureExpired, BadSignature, KeyError, TypeError):
+            return None
+
+    async def delete(self, token: Optional[str]) -> None:
+        return None  # The cookie is cleared; the token itself expires on its own
+
+
+def make_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "signed":
+        return SignedTokenStore(os.getenv("SESSION_SECRET"))
+    raise ValueError(f"Unknown SESSION_BACKEND '{backend}'; use sqlite or signed")
+
+
+session_store = make_session_store()
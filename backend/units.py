@@ -0,0 +1,65 @@
+from typing import Dict, Optional, Tuple
+
+from backend.models import UnitType
+
+# Conversion registry for material quantities. Each physical unit belongs to a
+# dimension with one canonical unit; quantities are summed in that unit.
+MASS, VOLUME, AREA, COUNT = "mass", "volume", "area", "count"
+
+CANONICAL_UNITS: Dict[str, UnitType] = {
+    MASS: UnitType.kg,
+    VOLUME: UnitType.liter,
+    AREA: UnitType.square_meter,
+    COUNT: UnitType.piece,
+}
+
+# unit -> (dimension, factor to the canonical unit)
+UNIT_FACTORS: Dict[UnitType, Tuple[str, float]] = {
+    UnitType.kg: (MASS, 1.0),
+    UnitType.ton: (MASS, 1000.0),  # Metric tonne, as used on site
+    UnitType.metric_ton: (MASS, 1000.0),
+    UnitType.pound: (MASS, 0.45359237),
+    UnitType.ounce: (MASS, 0.028349523125),
+    UnitType.liter: (VOLUME, 1.0),
+    UnitType.milliliter: (VOLUME, 0.001),
+    UnitType.centiliter: (VOLUME, 0.01),
+    UnitType.cubic_meter: (VOLUME, 1000.0),
+    UnitType.cubic_foot: (VOLUME, 28.316846592),
+    UnitType.gallon: (VOLUME, 3.785411784),  # US gallon
+    UnitType.barrel: (VOLUME, 158.987294928),  # Oil barrel
+    UnitType.square_meter: (AREA, 1.0),
+    UnitType.hectare: (AREA, 10000.0),
+    UnitType.acre: (AREA, 4046.8564224),
+    UnitType.piece: (COUNT, 1.0),
+    UnitType.nos: (COUNT, 1.0),
+    UnitType.dozen: (COUNT, 12.0),
+}
+
+# Packaging units only have a size for a given material, e.g. a bag of cement.
+# Keyed by (lower-cased material name, unit) -> (unit it converts to, factor).
+MATERIAL_UNIT_FACTORS: Dict[Tuple[str, UnitType], Tuple[UnitType, float]] = {
+    ("cement", UnitType.bag): (UnitType.kg, 50.0),
+    ("sand", UnitType.bag): (UnitType.kg, 50.0),
+    ("lime", UnitType.bag): (UnitType.kg, 25.0),
+    ("bricks", UnitType.pallet): (UnitType.piece, 500.0),
+    ("tiles", UnitType.piece_per_box): (UnitType.piece, 10.0),
+}
+
+
+def register_material_factor(material_name: str, unit: UnitType, to_unit: UnitType, factor: float) -> None:
+    """Declare how many ``to_unit`` one ``unit`` of ``material_name`` holds."""
+    if to_unit not in UNIT_FACTORS:
+        raise ValueError(f"{to_unit.value} has no canonical conversion")
+    MATERIAL_UNIT_FACTORS[(material_name.strip().lower(), unit)] = (to_unit, factor)
+
+
+def to_canonical(material_name: str, unit: UnitType, quantity: float) -> Optional[Tuple[str, float]]:
+    """(dimension, quantity in the canonical unit), or None when the unit cannot be converted."""
+    material_factor = MATERIAL_UNIT_FACTORS.get((material_name.strip().lower(), unit))
+    if material_factor is not None:
+        unit, per_unit = material_factor
+        quantity = quantity * per_unit
+    if unit not in UNIT_FACTORS:
+        return None
+    dimension, factor = UNIT_FACTORS[unit]
+    return dimension, quantity * factor
@@ -1,5 +1,11 @@
 import asyncio
+import gzip
+import hashlib
 import os
+import sqlite3
+import tempfile
+import time
+from typing import Optional
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
@@ -13,7 +19,15 @@ CREDENTIALS_PATH = os.getenv('GOOGLE_CREDENTIALS_PATH')  # Path to the service a
 # Define the root path based on the known location of main.py
 ROOT_FOLDER_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 LOCAL_FILE_PATH = os.path.join(ROOT_FOLDER_PATH, 'labour_management.db')
-REMOTE_FILE_NAME = 'labour_management.db'  # File name on Google Drive
+REMOTE_FILE_NAME = 'labour_management.db'  # Uncompressed copy uploaded by earlier versions; restored until a .gz exists
+REMOTE_BACKUP_NAME = REMOTE_FILE_NAME + '.gz'  # Compressed snapshots written by DriveBackup
+
+# Seconds between background backups
+BACKUP_INTERVAL = float(os.getenv('DRIVE_BACKUP_INTERVAL', '300'))
+# Transfer chunk for resumable uploads and downloads; a multiple of 256 KiB as
+# Drive requires. Most databases fit in one request, and a failed chunk is
+# retried on its own.
+DRIVE_CHUNK_SIZE = int(os.getenv('DRIVE_CHUNK_SIZE', str(32 * 1024 * 1024)))
 
 # Google Drive API Scopes
 SCOPES = ['https://www.googleapis.com/auth/drive']
@@ -26,68 +40,254 @@ def authenticate_google_drive():
     creds = Credentials.from_service_account_file(CREDENTIALS_PATH, scopes=SCOPES)
     return build('drive', 'v3', credentials=creds)
 
-async def upload_file_to_drive(service):
-    """Uploads or updates the SQLite file on Google Drive."""
-    try:
-        # Search for an existing file by name in the specified Google Drive folder
-        list_req = service.files().list(
-            q=f"name='{REMOTE_FILE_NAME}' and '{GOOGLE_DRIVE_FOLDER_ID}' in parents and trashed=false",
-            fields="files(id, name)"
-        )
-        results = await asyncio.to_thread(list_req.execute)
-
-        # Delete existing file if found
-        if results.get('files'):
-            for file in results['files']:
-                del_req = service.files().delete(fileId=file['id'])
-                await asyncio.to_thread(del_req.execute)
-                print(f"Deleted existing file '{file['name']}' on Google Drive.")
+
+class DriveStorage:
+    """The few Drive calls backup and restore need. Blocking; run them in a thread."""
+
+    def __init__(self, service, folder_id: Optional[str] = GOOGLE_DRIVE_FOLDER_ID):
+        self.service = service
+        self.folder_id = folder_id
+
+    def find(self, name: str) -> Optional[dict]:
+        """Metadata (id, size, md5Checksum, modifiedTime, appProperties) of the named file, or None."""
+        results = self.service.files().list(
+            q=f"name='{name}' and '{self.folder_id}' in parents and trashed=false",
+            fields="files(id, name, size, md5Checksum, modifiedTime, appProperties)"
+        ).execute()
+        files = results.get('files')
+        return files[0] if files else None
+
+    def upload(self, path: str, name: str, file_id: Optional[str] = None, properties: Optional[dict] = None) -> str:
+        """Resumable chunked upload; updates ``file_id`` in place when given. Returns the file id."""
+        media = MediaFileUpload(path, mimetype='application/gzip', chunksize=DRIVE_CHUNK_SIZE, resumable=True)
+        body = {'appProperties': properties or {}}
+        if file_id:
+            request = self.service.files().update(fileId=file_id, body=body, media_body=media, fields='id')
         else:
-            print(f"File '{REMOTE_FILE_NAME}' not found; a new file will be uploaded.")
+            body.update(name=name, parents=[self.folder_id])
+            request = self.service.files().create(body=body, media_body=media, fields='id')
+        response = None
+        while response is None:
+            # A failed chunk raises; the next call to next_chunk() resumes from the last one sent
+            _, response = request.next_chunk(num_retries=3)
+        return response['id']
 
-        # Upload the new file
-        file_metadata = {
-            'name': REMOTE_FILE_NAME,
-            'parents': [GOOGLE_DRIVE_FOLDER_ID]
-        }
-        media = MediaFileUpload(LOCAL_FILE_PATH, resumable=True)
-        create_req = service.files().create(body=file_metadata, media_body=media, fields='id')
-        uploaded_file = await asyncio.to_thread(create_req.execute)
-        print(f"File uploaded to Google Drive successfully. File ID: {uploaded_file.get('id')}")
+    def download(self, file_id: str, fh) -> None:
+        request = self.service.files().get_media(fileId=file_id)
+        downloader = MediaIoBaseDownload(fh, request, chunksize=DRIVE_CHUNK_SIZE)
+        done = False
+        while not done:
+            _, done = downloader.next_chunk(num_retries=3)
 
-    except HttpError as e:
-        print(f"Failed to upload file to Google Drive: {e}")
 
+def connect_drive() -> Optional[DriveStorage]:
+    service = authenticate_google_drive()
+    return DriveStorage(service) if service else None
 
-async def download_file_from_drive(service):
-    """Downloads the latest SQLite file from Google Drive to LOCAL_FILE_PATH."""
+
+def snapshot_database(db_path: str, snapshot_path: str) -> None:
+    """Consistent copy of a live database through SQLite's online backup API."""
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(snapshot_path)
     try:
-        # Search for the file by name
-        list_req = service.files().list(
-            q=f"name='{REMOTE_FILE_NAME}' and '{GOOGLE_DRIVE_FOLDER_ID}' in parents and trashed=false",
-            fields="files(id, name)"
-        )
-        results = await asyncio.to_thread(list_req.execute)
-
-        if not results.get('files'):
-            print(f"File '{REMOTE_FILE_NAME}' not found in Google Drive.")
-            return
-
-        # Download the file
-        file_id = results['files'][0]['id']
-        request = service.files().get_media(fileId=file_id)
-
-        # We also need to run file I/O in thread to be fully async-safe, but here
-        # the main blocking calls are network I/O from downloader.next_chunk()
-        with open(LOCAL_FILE_PATH, 'wb') as fh:
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while not done:
-                status, done = await asyncio.to_thread(downloader.next_chunk)
-                if status:
-                    print(f"Download progress: {int(status.progress() * 100)}%")
-
-        print(f"Downloaded file to {LOCAL_FILE_PATH} successfully.")
-
-    except HttpError as e:
-        print(f"Failed to download file from Google Drive: {e}")
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def compress_file(path: str, gz_path: str) -> str:
+    """Gzip ``path`` into ``gz_path``; returns the SHA-256 of the uncompressed bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as src, gzip.GzipFile(gz_path, 'wb', compresslevel=6, mtime=0) as dst:
+        for chunk in iter(lambda: src.read(1024 * 1024), b''):
+            digest.update(chunk)
+            dst.write(chunk)
+    return digest.hexdigest()
+
+
+class DriveBackup:
+    """Periodic compressed snapshots of the database, uploaded only when they change.
+
+    ``synced_hash`` is what restore_from_drive returned: the SHA-256 this
+    process restored from Drive or found already matching it. An existing
+    backup with any other content is never overwritten, since the local
+    database may be the stale copy shipped in the image.
+    """
+
+    def __init__(
+        self, storage: DriveStorage, db_path: str = LOCAL_FILE_PATH, name: str = REMOTE_BACKUP_NAME,
+        synced_hash: Optional[str] = None, legacy_name: Optional[str] = REMOTE_FILE_NAME
+    ):
+        self.storage = storage
+        self.db_path = db_path
+        self.name = name
+        self.synced_hash = synced_hash
+        self.legacy_name = legacy_name
+        self.file_id: Optional[str] = None
+        self.last_hash: Optional[str] = None
+        self._checked_remote = False
+        self._lock = asyncio.Lock()  # The loop and the shutdown backup never overlap
+
+    async def run_once(self) -> bool:
+        """Back up now; returns False when the content is unchanged since the last upload."""
+        async with self._lock:
+            with tempfile.TemporaryDirectory() as tmp:
+                snapshot_path = os.path.join(tmp, 'snapshot.db')
+                snapshot_at = time.time()
+                await asyncio.to_thread(snapshot_database, self.db_path, snapshot_path)
+                digest = await asyncio.to_thread(compress_file, snapshot_path, snapshot_path + '.gz')
+
+                if not self._checked_remote:
+                    # First run: pick up the existing backup so it is updated in place,
+                    # provided this process restored it or holds the same content
+                    remote = await asyncio.to_thread(self.storage.find, self.name)
+                    if remote:
+                        remote_hash = remote.get('appProperties', {}).get('sha256')
+                        if remote_hash is None or remote_hash not in (self.synced_hash, digest):
+                            print("Not backing up: the Drive backup was not restored into this database.")
+                            return False
+                        self.file_id = remote['id']
+                        self.last_hash = remote_hash
+                    elif self.synced_hash is None and self.legacy_name and \
+                            await asyncio.to_thread(self.storage.find, self.legacy_name):
+                        print(f"Not backing up: '{self.legacy_name}' on Drive was not restored into this database.")
+                        return False
+                    self._checked_remote = True
+
+                if digest == self.last_hash:
+                    return False
+                self.file_id = await asyncio.to_thread(
+                    self.storage.upload, snapshot_path + '.gz', self.name, self.file_id,
+                    {'sha256': digest, 'snapshot_at': f'{snapshot_at:.3f}'}
+                )
+                self.last_hash = digest
+                print(f"Database backed up to Google Drive ({digest[:12]}).")
+                return True
+
+    async def run_forever(self, interval: float = BACKUP_INTERVAL) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except (HttpError, OSError, sqlite3.Error) as e:
+                print(f"Failed to back up database to Google Drive: {e}")
+            await asyncio.sleep(interval)
+
+
+def file_digest(path: str, algorithm: str = 'sha256') -> str:
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def check_integrity(db_path: str) -> Optional[str]:
+    """None when SQLite's integrity check passes, else its first complaint."""
+    conn = sqlite3.connect(db_path)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+    return None if result == 'ok' else result
+
+
+def _decompress_file(gz_path: str, path: str) -> str:
+    """Gunzip ``gz_path`` into ``path``; returns the SHA-256 of the uncompressed bytes."""
+    digest = hashlib.sha256()
+    with gzip.open(gz_path, 'rb') as src, open(path, 'wb') as dst:
+        for chunk in iter(lambda: src.read(1024 * 1024), b''):
+            digest.update(chunk)
+            dst.write(chunk)
+    return digest.hexdigest()
+
+
+class RestoreError(Exception):
+    pass
+
+
+def _swap_in(restored_path: str, db_path: str) -> None:
+    # A WAL left by the old database would be replayed onto the new one
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.replace(restored_path, db_path)  # Atomic: readers see the old file or the new one
+
+
+async def _restore_uncompressed(storage: DriveStorage, remote: dict, db_path: str) -> str:
+    # Same checks and swap as a compressed backup, minus the recorded SHA-256,
+    # which the uncompressed copies never had; returns the restored file's digest
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(db_path))) as tmp:
+        restored_path = os.path.join(tmp, 'restored.db')
+        with open(restored_path, 'wb') as fh:
+            await asyncio.to_thread(storage.download, remote['id'], fh)
+        if remote.get('md5Checksum') and await asyncio.to_thread(file_digest, restored_path, 'md5') != remote['md5Checksum']:
+            raise RestoreError("download does not match the Drive checksum")
+        problem = await asyncio.to_thread(check_integrity, restored_path)
+        if problem:
+            raise RestoreError(f"integrity check failed: {problem}")
+        digest = await asyncio.to_thread(file_digest, restored_path)
+        await asyncio.to_thread(_swap_in, restored_path, db_path)
+    return digest
+
+
+async def restore_from_drive(
+    storage: DriveStorage, db_path: str = LOCAL_FILE_PATH, name: str = REMOTE_BACKUP_NAME,
+    legacy_name: Optional[str] = REMOTE_FILE_NAME
+) -> Optional[str]:
+    """Replace the local database with the Drive backup unless it already has the same content.
+
+    The backup is downloaded next to the database, checked against the
+    checksums recorded on Drive and by PRAGMA integrity_check, and only then
+    swapped in with an atomic rename. Any failure leaves the local file as it was.
+    Call before the database is opened.
+
+    Freshness is decided by content, never by mtime: the local file may be the
+    copy shipped in the image, whose mtime is the build time. Returns the
+    SHA-256 the local database now shares with Drive (pass it to DriveBackup),
+    or None when nothing was restored or verified.
+
+    Until the first compressed backup exists, the uncompressed ``legacy_name``
+    file that earlier versions kept on Drive is restored instead.
+    """
+    try:
+        remote = await asyncio.to_thread(storage.find, name)
+        if remote is None:
+            legacy = await asyncio.to_thread(storage.find, legacy_name) if legacy_name else None
+            if legacy is None:
+                print(f"File '{name}' not found in Google Drive.")
+                return None
+            digest = await _restore_uncompressed(storage, legacy, db_path)
+            print(f"Restored {db_path} from the uncompressed '{legacy_name}' on Google Drive ({digest[:12]}).")
+            return digest
+        expected_sha256 = remote.get('appProperties', {}).get('sha256')
+
+        # Same directory as the database, so the final rename cannot cross filesystems
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(db_path))) as tmp:
+            if os.path.exists(db_path) and expected_sha256:
+                snapshot_path = os.path.join(tmp, 'local.db')
+                await asyncio.to_thread(snapshot_database, db_path, snapshot_path)
+                if await asyncio.to_thread(file_digest, snapshot_path) == expected_sha256:
+                    print("Local database matches the Drive backup; skipping restore.")
+                    return expected_sha256
+
+            gz_path = os.path.join(tmp, name)
+            with open(gz_path, 'wb') as fh:
+                await asyncio.to_thread(storage.download, remote['id'], fh)
+            if remote.get('md5Checksum') and await asyncio.to_thread(file_digest, gz_path, 'md5') != remote['md5Checksum']:
+                raise RestoreError("download does not match the Drive checksum")
+
+            restored_path = os.path.join(tmp, 'restored.db')
+            digest = await asyncio.to_thread(_decompress_file, gz_path, restored_path)
+            if expected_sha256 and digest != expected_sha256:
+                raise RestoreError("backup content does not match its recorded SHA-256")
+            problem = await asyncio.to_thread(check_integrity, restored_path)
+            if problem:
+                raise RestoreError(f"integrity check failed: {problem}")
+
+            await asyncio.to_thread(_swap_in, restored_path, db_path)
+        print(f"Restored {db_path} from Google Drive ({digest[:12]}).")
+        return digest
+    except (HttpError, RestoreError, OSError, sqlite3.Error, EOFError) as e:
+        print(f"Failed to restore database from Google Drive: {e}")
+        return None
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.cache import invalidate_tables
+from backend.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteOp = Callable[[AsyncSession], Awaitable[T]]
+
+# Group commit. Instead of every request committing its own small transaction,
+# writers hand an operation to one task per process, which runs whatever
+# arrives within WRITE_BATCH_MAX_LATENCY seconds (up to WRITE_BATCH_MAX_SIZE
+# operations) in a single transaction: one lock, one commit, one fsync.
+WRITE_BATCH_MAX_SIZE = int(os.getenv("WRITE_BATCH_MAX_SIZE", "64"))
+WRITE_BATCH_MAX_LATENCY = float(os.getenv("WRITE_BATCH_MAX_LATENCY", "0.005"))
+
+_STOP = object()  # Queued by stop(); everything ahead of it is still committed
+
+
+class WriteQueue:
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        max_batch: int = WRITE_BATCH_MAX_SIZE,
+        max_latency: float = WRITE_BATCH_MAX_LATENCY,
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.batches = 0
+        self.writes = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def submit(self, op: WriteOp, *tables: str) -> T:
+        """Run ``op(db)`` in the next batch and return its result once the batch is committed.
+
+        ``op`` must not commit. If it raises, only this caller gets the
+        exception: the batch is run again with each write in a savepoint, so
+        ``op`` may run twice. ``tables`` are invalidated in the count caches
+        after the commit. Raises RuntimeError once stop() has been called.
+        """
+        if self._stopping:
+            raise RuntimeError("Write queue is stopped")
+        if self._task is None or self._task.done():
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        # No await between the check above and here, so nothing lands behind _STOP
+        self._queue.put_nowait((op, tables, future))
+        return await future
+
+    def start(self) -> None:
+        """Start the writer task (again, after stop()) in the running event loop."""
+        self._stopping = False
+        if self._task is not None and not self._task.done():
+            return
+        # The previous task drained its queue before it ended; a fresh one is
+        # bound to this loop, which after a restart may not be the old one
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Commit whatever is already queued, then stop the writer task and refuse new writes."""
+        self._stopping = True
+        if self._task is None or self._task.done():
+            return
+        self._queue.put_nowait(_STOP)
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "avg_batch": round(self.writes / self.batches, 2) if self.batches else 0.0,
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                # Take what is already waiting, then wait a little for more writers,
+                # until the batch is full or the latency budget is spent
+                deadline = loop.time() + self.max_latency
+                while batch[-1] is not _STOP and len(batch) < self.max_batch:
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                stop = batch[-1] is _STOP
+                try:
+                    await self._commit([item for item in batch if item is not _STOP])
+                except Exception as e:
+                    # A bug past the database calls fails this batch, not the writer task
+                    logger.exception("Write batch failed")
+                    self._fail(batch, e)
+                if stop:
+                    return
+        finally:
+            # However the task ends (stopped, cancelled), no caller is left waiting
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._fail(batch, RuntimeError("Write queue is stopped"))
+
+    @staticmethod
+    def _fail(batch: List, error: BaseException) -> None:
+        for item in batch:
+            if item is not _STOP and not item[2].done():
+                item[2].set_exception(error)
+
+    async def _commit(self, batch: List[Tuple]) -> None:
+        # Callers that gave up (cancelled request) are dropped before their write runs
+        batch = [(op, tables, future) for op, tables, future in batch if not future.done()]
+        if not batch:
+            return
+        try:
+            try:
+                outcomes = await self._apply(batch, isolate=False)
+            except Exception as e:
+                if len(batch) == 1:
+                    outcomes = [(batch[0][2], (), None, e)]
+                else:
+                    # Run the batch again with every write in its own savepoint, so
+                    # the one that failed is rolled back alone and the rest commit
+                    outcomes = await self._apply(batch, isolate=True)
+        except Exception as e:
+            # Nothing in the batch was committed; every caller gets the error
+            logger.error(f"Failed to commit a batch of {len(batch)} writes: {e}")
+            self._fail(batch, e)
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        changed = {table for _, tables, _, error in outcomes if error is None for table in tables}
+        if changed:
+            invalidate_tables(*changed)
+        for future, _, result, error in outcomes:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    async def _apply(self, batch: List[Tuple], isolate: bool) -> List[Tuple]:
+        outcomes = []
+        async with self.session_factory() as db:
+            # Take the write lock up front rather than upgrading a read lock
+            # mid-batch, and make any savepoints nest inside one transaction
+            await db.execute(text("BEGIN IMMEDIATE"))
+            for op, tables, future in batch:
+                if not isolate:
+                    outcomes.append((future, tables, await op(db), None))
+                    continue
+                try:
+                    async with db.begin_nested():
+                        outcomes.append((future, tables, await op(db), None))
+                except Exception as e:
+                    outcomes.append((future, (), None, e))
+            await db.commit()
+        return outcomes
+
+
+write_queue = WriteQueue()
@@ -0,0 +1,96 @@
+"""Attendance write throughput under each SQLite PRAGMA profile.
+
+Every write goes through crud.create_attendance in its own session and
+transaction, the way POST /labours/{id}/attendance/ does, against a fresh
+database file per profile. The "old" row is the previous setup: SQLAlchemy's
+default NullPool, so a new connection per session, plus the per-request
+`PRAGMA journal_mode=WAL` that get_db used to run. The "group commit" rows
+send the same writes through backend.writes.WriteQueue instead, batching up
+to the given number of writes per transaction.
+
+    python -m benchmarks.attendance_writes [--writes 2000] [--concurrency 64]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+from backend import crud, schemas
+from backend.database import Base, SQLITE_PROFILES, apply_sqlite_pragmas, sqlite_pragmas
+from backend.models import Laborer
+from backend.writes import WriteQueue
+
+LABORERS = 50
+
+
+async def run(db_path: str, profile: str, old: bool, writes: int, concurrency: int, batch: int = 0) -> Tuple[float, int]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool if old else AsyncAdaptedQueuePool)
+    apply_sqlite_pragmas(engine, sqlite_pragmas(profile))
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with Session() as db:
+        db.add_all(Laborer(name=f"Worker {n}", age=30, gender="M", daily_wage=500,
+                           date_of_joining=date(2024, 1, 1)) for n in range(LABORERS))
+        await db.commit()
+
+    write_queue = WriteQueue(Session, max_batch=batch) if batch else None
+    failures = []
+    queue = asyncio.Queue()
+    for n in range(writes):
+        queue.put_nowait(n)
+
+    async def worker():
+        while not queue.empty():
+            n = queue.get_nowait()
+            mark = schemas.AttendanceBase(
+                laborer_id=n % LABORERS + 1, laborer_name="", present="present", hours_worked=8,
+                date=date(2024, 1, 1) + timedelta(days=n // LABORERS), site_name="North",
+            )
+            try:
+                if write_queue:
+                    await write_queue.submit(lambda db: crud.write_attendance(db, mark.laborer_id, mark), "attendance")
+                    continue
+                async with Session() as db:
+                    if old:
+                        await db.execute(text("PRAGMA journal_mode=WAL"))
+                    await crud.create_attendance(db, mark.laborer_id, mark)
+            except OperationalError:  # "database is locked"
+                failures.append(n)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    if write_queue:
+        await write_queue.stop()
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return (writes - len(failures)) / elapsed, len(failures)
+
+
+async def main(writes: int, concurrency: int) -> None:
+    cases = [("old: no pool, WAL per request", "minimal", True, 0)]
+    cases += [(profile, profile, False, 0) for profile in SQLITE_PROFILES]
+    cases += [(f"{profile} + group commit, batch {batch}", profile, False, batch)
+              for profile in ("balanced", "durable") for batch in (1, 8, 64)]
+    print(f"{writes} attendance writes, {concurrency} concurrent sessions")
+    for label, profile, old, batch in cases:
+        with tempfile.TemporaryDirectory() as tmp:
+            rate, failed = await run(os.path.join(tmp, "bench.db"), profile, old, writes, concurrency, batch)
+        print(f"  {label:<40} {rate:8.0f} writes/s" + (f"  ({failed} failed: database is locked)" if failed else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.writes, args.concurrency))
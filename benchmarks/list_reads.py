@@ -0,0 +1,98 @@
+"""Time and peak memory of one large attendance page: ORM entities vs column projection.
+
+The "orm" row is the previous read path: Attendance entities with their
+laborers selectin-loaded, copied field by field into dicts. The "projection"
+row is crud.get_all_attendance. Both results are validated against the
+response model, as FastAPI does.
+
+    python -m benchmarks.list_reads [--rows 20000] [--page 5000]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker, selectinload
+
+from backend import crud, schemas
+from backend.database import Base, apply_sqlite_pragmas, sqlite_pragmas
+from backend.models import Attendance, Laborer
+
+LABORERS = 200
+page_adapter = TypeAdapter(list[schemas.Attendance])
+
+
+async def orm_page(db: AsyncSession, limit: int):
+    result = await db.execute(
+        select(Attendance).options(selectinload(Attendance.laborer)).order_by(Attendance.id).limit(limit)
+    )
+    return [
+        {
+            "id": attendance.id,
+            "laborer_id": attendance.laborer.id,
+            "laborer_name": attendance.laborer.name,
+            "date": attendance.date,
+            "present": attendance.present,
+            "hours_worked": attendance.hours_worked,
+            "site_name": attendance.site_name,
+        }
+        for attendance in result.scalars().all()
+    ]
+
+
+async def projection_page(db: AsyncSession, limit: int):
+    return await crud.get_all_attendance(db, skip=0, limit=limit)
+
+
+async def measure(Session, read_page, limit: int, repeats: int = 5):
+    # Timed without tracemalloc, whose hooks would dominate the timing
+    timings = []
+    for _ in range(repeats):
+        async with Session() as db:  # A fresh session per request, as in get_db
+            started = time.perf_counter()
+            page_adapter.validate_python(await read_page(db, limit), from_attributes=True)
+            timings.append(time.perf_counter() - started)
+    async with Session() as db:
+        tracemalloc.start()
+        page_adapter.validate_python(await read_page(db, limit), from_attributes=True)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return min(timings), peak
+
+
+async def main(rows: int, page: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        apply_sqlite_pragmas(engine, sqlite_pragmas())
+        Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(Laborer), [
+                {"name": f"Worker {n}", "age": 30, "gender": "M", "daily_wage": 500, "date_of_joining": date(2024, 1, 1)}
+                for n in range(LABORERS)
+            ])
+            await conn.execute(insert(Attendance), [
+                {"laborer_id": n % LABORERS + 1, "date": date(2024, 1, 1) + timedelta(days=n // LABORERS),
+                 "present": "present", "hours_worked": 8, "site_name": "North"}
+                for n in range(rows)
+            ])
+
+        print(f"One page of {page} attendance rows")
+        for label, read_page in (("orm", orm_page), ("projection", projection_page)):
+            elapsed, peak = await measure(Session, read_page, page)
+            print(f"  {label:<12} {elapsed * 1000:8.1f} ms  {elapsed / page * 1e6:6.1f} us/row  {peak / 1024:8.0f} KiB peak")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--page", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.page))
@@ -6,20 +6,41 @@ document.getElementById("logout-button").addEventListener("click", () => {
     });
 });
 
-document.getElementById("presence-form").addEventListener("submit", (e) => {
-    e.preventDefault();
+// Load every dashboard KPI with a single request
+async function loadSummary() {
+    try {
+        const response = await fetch("/dashboard/summary");
+        if (!response.ok) throw new Error("Failed to load dashboard summary");
+        const summary = await response.json();
 
-    const laborerId = document.getElementById("laborer-id").value;
-    const present = document.getElementById("present").value === "true";
+        const presentToday = summary.attendance_today.reduce((total, site) => total + site.present_count, 0);
+        const sitesToday = summary.attendance_today
+            .map(site => `${site.site_name || "Unassigned"}: ${site.present_count}`)
+            .join(", ");
+        const stockSites = new Set(summary.material_stock.map(item => item.site_name)).size;
 
-    fetch("/admin/presence/", {
-        method: "POST",
-        headers: {
-            "Content-Type": "application/json",
-        },
-        body: JSON.stringify({ laborer_id: laborerId, present }),
-    }).then(response => response.json()).then(data => {
-        alert(data.message); // Display success message
-        document.getElementById("presence-form").reset(); // Reset the form
-    });
-});
+        const cards = [
+            ["Laborers", `${summary.active_laborers} active of ${summary.total_laborers}`],
+            ["Present Today", `${presentToday}${sitesToday ? ` (${sitesToday})` : ""}`],
+            ["Material Stock", `${summary.material_stock.length} items across ${stockSites} sites`],
+            ["Payments", `Week: ${summary.payments_week.toFixed(2)} / Month: ${summary.payments_month.toFixed(2)}`],
+        ];
+
+        const container = document.getElementById("dashboard-summary");
+        container.innerHTML = "";
+        cards.forEach(([title, value]) => {
+            const card = document.createElement("div");
+            card.className = "card";
+            const heading = document.createElement("h3");
+            heading.textContent = title;
+            const text = document.createElement("p");
+            text.textContent = value;
+            card.append(heading, text);
+            container.appendChild(card);
+        });
+    } catch (error) {
+        console.error(error);
+    }
+}
+
+loadSummary();
@@ -41,7 +41,8 @@ async function loadMaterials(page = 1) {
         if (!response.ok) throw new Error('Failed to load materials');
         const data = await response.json();
         renderMaterials(data); // Adjusted to use the correct data structure
-        updatePagination(materialPagination, page, data.length, loadMaterials);
+        const totalMaterials = parseInt(response.headers.get('X-Total-Count'), 10) || data.length;
+        updatePagination(materialPagination, page, totalMaterials, loadMaterials);
     } catch (error) {
         console.error(error);
         alert('Error loading materials');
@@ -186,10 +187,9 @@ async function loadSites(page = 1) {
         // Assuming data is directly an array of sites, adjust if your response structure is different
         renderSites(data); // Adjusted to use the correct data structure
 
-        // Update pagination
-        const totalSitesResponse = await fetch('/sites/'); // Fetch the total count of sites for pagination
-        const totalSitesData = await totalSitesResponse.json();
-        updatePagination(sitePagination, page, totalSitesData.length, loadSites);
+        // Update pagination using the total count sent with the page
+        const totalSites = parseInt(response.headers.get('X-Total-Count'), 10) || data.length;
+        updatePagination(sitePagination, page, totalSites, loadSites);
 
     } catch (error) {
         console.error(error);
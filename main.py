@@ -1,58 +1,94 @@
-from fastapi import FastAPI, HTTPException, Depends, Request, Response,Query
+from fastapi import FastAPI, HTTPException, Depends, Request, Response,Query, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend import crud, models, schemas
-from backend.database import engine, get_db
-from sqlalchemy import select
-from typing import List
+from backend.database import engine, read_engine, get_db, get_read_db
+from backend.pagination import next_cursor, next_date_cursor
+from backend.cache import cache_stats
+from backend.pages import pages
+from backend.assets import assets, AssetFiles
+from backend.sessions import session_store, SESSION_TTL
+from backend.coordination import coordinator
+from backend.writes import write_queue
+from datetime import date
+from typing import List, Optional
 import os
-import secrets
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 import logging
 from backend import utility
+from backend.importer import import_rows
+from backend.exporter import stream_export, EXPORT_FORMATS
 import uvicorn
+import asyncio
 
 logger =logging.basicConfig(level=logging.INFO)
 
 # Lifespan event for startup and shutdown
 async def lifespan(app: FastAPI):
     # Startup tasks
-    # Authenticate with Mega and download the latest database
-    service =  utility.authenticate_google_drive()
-    try:
-        if service:
-            # Upload the updated database file to Google Drive on startup
-            await utility.upload_file_to_drive(service)
-            print("Database upload to Google Drive complete.")
-            await utility.download_file_from_drive(service)  # Ensure the latest database file is available
-        else:
-            print("Skipping Google Drive startup sync due to missing credentials.")
-
-        # Set up the database
-        async with engine.begin() as conn:
-            await conn.run_sync(models.Base.metadata.create_all)
-        print("Database setup complete.")
-    except Exception as e:
-        print(f"Startup error: {e}")
+    # Minify, fingerprint and compress the static assets, then load the HTML
+    # pages (which reference the fingerprinted names) before the first request
+    await asyncio.to_thread(assets.build)
+    await pages.preload()
+
+    # With several workers only the leader touches Drive and the schema; the
+    # others wait here until it is done
+    async with coordinator.setup() as is_leader:
+        drive = utility.connect_drive() if is_leader else None
+        synced_hash = None  # Content this process restored from Drive or found matching it
+        try:
+            if is_leader:
+                if drive:
+                    # Verified, atomic restore, skipped when the local copy has the same content
+                    synced_hash = await utility.restore_from_drive(drive)
+                else:
+                    print("Skipping Google Drive startup sync due to missing credentials.")
+
+                # Set up the database
+                async with engine.begin() as conn:
+                    await conn.run_sync(models.Base.metadata.create_all)
+                print("Database setup complete.")
+            else:
+                print("Database setup done by the leader worker.")
+        except Exception as e:
+            print(f"Startup error: {e}")
+
+    # Group commit for attendance marks; also undoes the stop() of a previous lifespan
+    write_queue.start()
+
+    # The leader removes expired admin sessions and backs up to Drive in the background
+    background = []
+    if is_leader:
+        background.append(asyncio.create_task(session_store.run_sweeper()))
+    # Never overwrites a Drive backup that was not restored or verified above
+    backup = utility.DriveBackup(drive, synced_hash=synced_hash) if drive else None
+    if backup:
+        background.append(asyncio.create_task(backup.run_forever()))
 
     yield  # FastAPI continues running here
 
     # Shutdown tasks
+    for task in background:
+        task.cancel()
     try:
-        if service:
-            # Upload the updated database file to Mega on shutdown
-            await utility.upload_file_to_drive(service)
-            print("Database upload to Google Drive complete.")
-        else:
+        # Commit writes still waiting for a batch
+        await write_queue.stop()
+
+        if backup:
+            # Final backup, skipped if nothing changed since the last one
+            await backup.run_once()
+        elif is_leader:
             print("Skipping Google Drive shutdown sync due to missing credentials.")
 
         # Clean up database resources
         await engine.dispose()
-        print("Database engine disposed.")
+        await read_engine.dispose()
+        print("Database engines disposed.")
     except Exception as e:
         print(f"Shutdown error: {e}")
+    finally:
+        coordinator.release()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -66,20 +102,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
-# Serve static files (HTML, CSS, JS) from the 'frontend' directory
-app.mount("/static", StaticFiles(directory="frontend"), name="static")
+# Serve static files (HTML, CSS, JS) from the 'frontend' directory; JS and CSS
+# come precompressed from the asset pipeline
+app.mount("/static", AssetFiles(directory="frontend", pipeline=assets), name="static")
 
-# Simulated session storage
-sessions = {}
+# Keyset pagination: list endpoints advertise the cursor for the following page
+def set_next_cursor(response: Response, cursor: Optional[str]):
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+
+# Total row count for pagination, served from the count cache
+async def set_total_count(response: Response, db: AsyncSession, model):
+    response.headers["X-Total-Count"] = str(await crud.count_rows(db, model))
 
 # Serve the login page at the root URL
 @app.get("/", response_class=HTMLResponse)
-async def read_root():
-    # Load and return the login.html file
-    with open(os.path.join("frontend", "login.html")) as file:
-        return file.read()
+async def read_root(request: Request):
+    return await pages.response(request, "login.html")
 
 # Admin login route
 @app.post("/admin/login/")
@@ -87,43 +129,45 @@ async def admin_login(login_request: models.LoginRequest, response: Response):
     from backend.auth import authenticate_admin
     try:
         authenticate_admin(login_request.username, login_request.password)
-        # Create a secure session ID for the admin user
-        session_id = secrets.token_hex(32)
-        sessions[session_id] = login_request.username  # Map session ID to username
-        response.set_cookie("session_id", session_id, httponly=True)
-        return {"message": "Login successful"}
     except Exception as e:
         logging.error(f"Login failed for {login_request.username}: {str(e)}")
         raise HTTPException(status_code=401, detail=str(e))  # Unauthorized
 
+    # Create a secure session ID for the admin user, visible to every worker
+    session_id = await session_store.create(login_request.username)
+    response.set_cookie("session_id", session_id, httponly=True, samesite="lax", max_age=SESSION_TTL)
+    return {"message": "Login successful"}
+
 # Admin logout route
 @app.post("/admin/logout/")
 async def admin_logout(request: Request, response: Response):
-    session_id = request.cookies.get("session_id")
-    if session_id in sessions:
-        del sessions[session_id]  # Remove session
+    await session_store.delete(request.cookies.get("session_id"))  # Remove session
     response.delete_cookie("session_id")
     return {"message": "Logout successful"}
 
 # Dependency to check if user is authenticated
 async def get_current_user(request: Request):
-    session_id = request.cookies.get("session_id")
-    if session_id not in sessions:
+    username = await session_store.get(request.cookies.get("session_id"))
+    if username is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    return sessions[session_id]
+    return username
 
 # Dashboard route
 @app.get("/admin/dashboard/", response_class=HTMLResponse)
-async def admin_dashboard(current_user: str = Depends(get_current_user)):
-    # Load and return the dashboard.html file
-    with open(os.path.join("frontend", "dashboard.html")) as file:
-        return file.read()
+async def admin_dashboard(request: Request, current_user: str = Depends(get_current_user)):
+    return await pages.response(request, "dashboard.html")
 
 @app.get("/labor-management/", response_class=HTMLResponse)
-async def labor_management(current_user: str = Depends(get_current_user)):
-    # Load and return the labor_management.html file
-    with open(os.path.join("frontend", "labor-management.html")) as file:
-        return file.read()
+async def labor_management(request: Request, current_user: str = Depends(get_current_user)):
+    return await pages.response(request, "labor-management.html")
+
+# Dashboard KPIs in a single request
+@app.get("/dashboard/summary", response_model=schemas.DashboardSummary)
+async def dashboard_summary(current_user: str = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
+    try:
+        return await crud.get_dashboard_summary(db)
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error occurred")
 
 ## Labour details
 
@@ -141,18 +185,20 @@ async def create_labour(labour: schemas.LaborerCreate, db: AsyncSession = Depend
 
 # Get All Labours
 @app.get("/labours/", response_model=list[schemas.Laborer])
-async def read_labours(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_labours(response: Response, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, db: AsyncSession = Depends(get_db)):
     try:
-        labours = await crud.get_labours(db=db, skip=skip, limit=limit)
+        labours = await crud.get_labours(db=db, skip=skip, limit=limit, cursor=cursor)
+        set_next_cursor(response, next_cursor(labours, limit))
+        await set_total_count(response, db, models.Laborer)
         return labours
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Database error occurred")  # Generic error message
 
 # Search Labours by Name
 @app.get("/labours/search/", response_model=list[schemas.Laborer])
-async def search_labours(name: str, db: AsyncSession = Depends(get_db)):
+async def search_labours(name: str, limit: int = Query(20, gt=0, le=100), db: AsyncSession = Depends(get_db)):
     try:
-        return await crud.search_labours(db, name)
+        return await crud.search_labours(db, name, limit)
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Database error occurred")  # Generic error message
 
@@ -194,16 +240,16 @@ async def delete_labour(labour_id: int, db: AsyncSession = Depends(get_db)):
 async def record_attendance(labour_id: int, attendance_data: schemas.AttendanceCreate, db: AsyncSession = Depends(get_db)):
     logging.info(f"Received labour attendance: {attendance_data}")
     try:
-        # Call the CRUD function to create attendance
-        new_attendance = await crud.create_attendance(db, labour_id, attendance_data)
-
-        # Fetch the laborer name to include in the response
-        laborer = await db.execute(select(models.Laborer).filter(models.Laborer.id == labour_id))
-        laborer = laborer.scalar_one_or_none()
-
+        # The laborer's name comes from the lookup cache; the foreign key rejects a deleted laborer
+        laborer = await crud.get_cached_labour(db, labour_id)
         if laborer is None:
             raise HTTPException(status_code=404, detail="Laborer not found")
 
+        # Committed together with other marks arriving at the same moment
+        new_attendance = await write_queue.submit(
+            lambda write_db: crud.write_attendance(write_db, labour_id, attendance_data), "attendance"
+        )
+
         # Return the newly created attendance with laborer_name
         return schemas.Attendance(
             id=new_attendance.id,
@@ -214,15 +260,44 @@ async def record_attendance(labour_id: int, attendance_data: schemas.AttendanceC
             hours_worked=new_attendance.hours_worked,
             site_name=new_attendance.site_name
         )
+    except IntegrityError:
+        # The laborer was deleted after it was cached
+        raise HTTPException(status_code=404, detail="Laborer not found")
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Database error occurred")
+    except RuntimeError:
+        # The write queue is stopped: the application is shutting down
+        raise HTTPException(status_code=503, detail="Server is shutting down, try again")
 
 
 # Get Attendance History
 @app.get("/labours/{labour_id}/attendance/", response_model=list[schemas.Attendance])
-async def get_attendance_history(labour_id: int, db: AsyncSession = Depends(get_db)):
+async def get_attendance_history(
+    labour_id: int,
+    response: Response,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    limit: int = Query(31, gt=0, le=366),  # Days per page
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        history = await crud.get_attendance_history(db, labour_id, from_date, to_date, limit, cursor)
+        set_next_cursor(response, next_date_cursor(history, limit))
+        return history
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error occurred")  # Generic error message
+
+# Attendance totals for a labourer over a date range
+@app.get("/labours/{labour_id}/attendance/summary", response_model=schemas.AttendanceSummary)
+async def get_attendance_summary(
+    labour_id: int,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_read_db)
+):
     try:
-        return await crud.get_attendance_history(db, labour_id)
+        return await crud.get_attendance_summary(db, labour_id, from_date, to_date)
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Database error occurred")  # Generic error message
 
@@ -231,21 +306,70 @@ async def get_attendance_history(labour_id: int, db: AsyncSession = Depends(get_
 async def get_all_attendance(
     db: AsyncSession = Depends(get_db),
     skip: int = Query(0, ge=0),  # Starting point (offset)
-    limit: int = Query(10, gt=0, le=100)  # Number of records to return
+    limit: int = Query(10, gt=0, le=100),  # Number of records to return
+    cursor: Optional[str] = None  # Opaque keyset cursor; takes precedence over skip
 ):
     try:
-        attendance_records = await crud.get_all_attendance(db, skip=skip, limit=limit)
+        attendance_records = await crud.get_all_attendance(db, skip=skip, limit=limit, cursor=cursor)
         
         total_count = await crud.count_all_attendance(db)  # Get total count for pagination
         return {
             "results": attendance_records,
-            "next": skip + limit if (skip + limit) < total_count else None,  # Calculate next page
-            "prev": skip - limit if skip > 0 else None,  # Calculate previous page
+            # Offset links only make sense in skip mode
+            "next": skip + limit if not cursor and (skip + limit) < total_count else None,  # Calculate next page
+            "prev": skip - limit if not cursor and skip > 0 else None,  # Calculate previous page
+            "next_cursor": next_cursor(attendance_records, limit),
             "total": total_count  # Total count for reference
         }
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Database error occurred")
 
+# Record a daily roll-call for a whole site in one request
+@app.post("/attendance/bulk", response_model=list[schemas.Attendance])
+async def record_attendance_bulk(bulk: schemas.AttendanceBulkCreate, db: AsyncSession = Depends(get_db)):
+    logging.info(f"Received bulk attendance for {bulk.site_name} on {bulk.date}: {len(bulk.marks)} marks")
+    return await crud.create_attendance_bulk(db, bulk)
+
+# Daily attendance totals per site from the rollup table
+@app.get("/attendance/daily", response_model=list[schemas.AttendanceDaily])
+async def get_attendance_daily(
+    site: Optional[str] = None,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    try:
+        return await crud.get_attendance_daily(db, site, from_date, to_date)
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+# Rebuild the daily attendance rollup from the raw attendance rows
+@app.post("/admin/attendance-daily/rebuild")
+async def rebuild_attendance_daily(current_user: str = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    rows = await crud.rebuild_attendance_daily(db)
+    return {"message": "Attendance rollup rebuilt", "rows": rows}
+
+# Hit and miss counts of the in-process caches
+@app.get("/admin/cache/stats")
+async def get_cache_stats(current_user: str = Depends(get_current_user)):
+    return cache_stats()
+
+# Payroll sheet for a site (or every site) over a date range
+@app.get("/payroll", response_model=schemas.PayrollSheet)
+async def get_payroll(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    site: Optional[str] = None,
+    shift_hours: float = Query(8.0, gt=0, le=24),  # Hours that make up one paid day
+    db: AsyncSession = Depends(get_read_db)
+):
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    try:
+        return await crud.get_payroll(db, from_date, to_date, site, shift_hours)
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
 # Get Attendance by ID
 @app.get("/attendance/{attendance_id}", response_model=schemas.Attendance)
 async def get_attendance(attendance_id: int, db: AsyncSession = Depends(get_db)):
@@ -288,9 +412,8 @@ async def delete_attendance(attendance_id: int, db: AsyncSession = Depends(get_d
 
 # Serve the materials management page
 @app.get("/materials-management/", response_class=HTMLResponse)
-async def materials_management_page():
-    with open("frontend/inventory-management.html") as file:
-        return file.read()
+async def materials_management_page(request: Request):
+    return await pages.response(request, "inventory-management.html")
 
 # CRUD Operations for Materials
 
@@ -300,8 +423,38 @@ async def create_material(material: schemas.MaterialCreate, db: AsyncSession = D
     return await crud.create_material(db, material)
 
 @app.get("/materials/", response_model=List[schemas.Material])
-async def get_materials(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
-    return await crud.get_materials(db, skip, limit)
+async def get_materials(response: Response, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    materials = await crud.get_materials(db, skip, limit, cursor)
+    set_next_cursor(response, next_cursor(materials, limit))
+    await set_total_count(response, db, models.Material)
+    return materials
+
+# Record material consumption at a site or a transfer between sites
+@app.post("/materials/movements", response_model=schemas.MaterialMovement)
+async def create_material_movement(movement: schemas.MaterialMovementCreate, db: AsyncSession = Depends(get_db)):
+    return await crud.create_material_movement(db, movement)
+
+# Stock movement history, optionally for one site
+@app.get("/materials/movements", response_model=List[schemas.MaterialMovement])
+async def get_material_movements(
+    response: Response,
+    site_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    movements = await crud.get_material_movements(db, site_id, skip, limit, cursor)
+    set_next_cursor(response, next_cursor(movements, limit))
+    return movements
+
+# Stock totals in canonical units, for one site or all of them
+@app.get("/materials/summary", response_model=schemas.MaterialSummary)
+async def get_material_summary(site_id: Optional[int] = None, db: AsyncSession = Depends(get_read_db)):
+    try:
+        return await crud.get_material_summary(db, site_id)
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error occurred")
 
 @app.get("/materials/{material_id}", response_model=schemas.Material)
 async def get_material(material_id: int, db: AsyncSession = Depends(get_db)):
@@ -332,9 +485,11 @@ async def create_site(site: schemas.SiteCreate, db: AsyncSession = Depends(get_d
 
 # Get All Sites
 @app.get("/sites/", response_model=list[schemas.Site])
-async def get_sites(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def get_sites(response: Response, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, db: AsyncSession = Depends(get_db)):
     try:
-        sites = await crud.get_sites(db, skip=skip, limit=limit)
+        sites = await crud.get_sites(db, skip=skip, limit=limit, cursor=cursor)
+        set_next_cursor(response, next_cursor(sites, limit))
+        await set_total_count(response, db, models.Site)
         return sites  # This should return the list of sites directly
     except SQLAlchemyError as e:
         logging.error(f"Database error occurred: {e}")
@@ -345,22 +500,20 @@ async def get_sites(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(g
 async def get_site(site_id: int, db: AsyncSession = Depends(get_db)):
     return await crud.get_site(db, site_id)
 
+# Current stock balances at a site
+@app.get("/sites/{site_id}/stock", response_model=List[schemas.SiteStock])
+async def get_site_stock(site_id: int, db: AsyncSession = Depends(get_read_db)):
+    try:
+        return await crud.get_site_stock(db, site_id)
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
 # Update Site
 @app.put("/sites/{site_id}", response_model=schemas.Site)
 async def update_site(site_id: int, site: schemas.SiteUpdate, db: AsyncSession = Depends(get_db)):
-    # Check if the site exists
-    existing_site = await db.get(models.Site, site_id)
-    if not existing_site:
-        raise HTTPException(status_code=404, detail="Site not found")
-
-    # Update the site
+    # Update the site (404 if it does not exist)
     try:
-        for key, value in site.model_dump().items():
-            setattr(existing_site, key, value)
-
-        db.add(existing_site)
-        await db.commit()
-        await db.refresh(existing_site)
+        existing_site = await crud.update_site(db, site_id, site)
 
         return schemas.Site(
             id=existing_site.id,
@@ -379,30 +532,20 @@ async def delete_site(site_id: int, db: AsyncSession = Depends(get_db)):
 ## Payments API Module
 # Serve the payment management page
 @app.get("/payment-management/", response_class=HTMLResponse)
-async def read_payments_management():
-    # Load and return the payment-management.html file
-    with open(os.path.join("frontend/payment-management.html")) as file:
-        return file.read()
+async def read_payments_management(request: Request):
+    return await pages.response(request, "payment-management.html")
 
 @app.post("/payments/", response_model=schemas.Payment)
 async def create_payment(payment: schemas.PaymentCreate, db: AsyncSession = Depends(get_db)):
-    db_payment = models.Payment(
-        amount=payment.amount,
-        date=payment.date,
-        labor_id=payment.labor_id,
-        site_id=payment.site_id,
-        material_name=payment.material_name,
-        description=payment.description
-    )
-    db.add(db_payment)
-    await db.commit()
-    await db.refresh(db_payment)  # Refresh to get updated data
-    return db_payment
+    return await crud.create_payment(db, payment)
 
 
 @app.get("/payments/", response_model=List[schemas.Payment])
-async def get_payments_endpoint(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
-    return await crud.get_payments(db, skip, limit)
+async def get_payments_endpoint(response: Response, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    payments = await crud.get_payments(db, skip, limit, cursor)
+    set_next_cursor(response, next_cursor(payments, limit))
+    await set_total_count(response, db, models.Payment)
+    return payments
 
 @app.get("/payments/{payment_id}", response_model=schemas.Payment)
 async def get_payment_endpoint(payment_id: int, db: AsyncSession = Depends(get_db)):
@@ -417,7 +560,48 @@ async def delete_payment_endpoint(payment_id: int, db: AsyncSession = Depends(ge
     return await crud.delete_payment(db, payment_id)
 
 
+## Bulk import
+
+# Import labours, materials, sites or payments from a CSV or NDJSON upload
+@app.post("/import/{entity}", response_model=schemas.ImportReport)
+async def import_entities(
+    entity: str,
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),  # Defaults to the file extension
+    current_user: str = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    fmt = format or ("ndjson" if (file.filename or "").lower().endswith((".ndjson", ".jsonl")) else "csv")
+    return await import_rows(db, entity, file.file, fmt)
+
+
+## Streaming export
+
+# Export attendance, payments or materials without paging, as CSV, NDJSON or Parquet
+@app.get("/export/{entity}")
+async def export_entities(
+    entity: str,
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    site: Optional[str] = None,  # Site name
+    site_id: Optional[int] = None,  # Payments and materials only
+    current_user: str = Depends(get_current_user)
+):
+    chunks = stream_export(entity, format, from_date, to_date, site, site_id)
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{format}"'},
+    )
+
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers > 1:
+        # Production: several worker processes, coordinated by the startup leader lock
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
 
 
@@ -0,0 +1,30 @@
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base, apply_sqlite_pragmas, sqlite_pragmas
+from backend.cache import clear_caches
+
+
+# A fresh in-memory database per test, with the application's PRAGMAs (so
+# foreign keys are enforced) and empty caches
+@pytest_asyncio.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    apply_sqlite_pragmas(engine, sqlite_pragmas())
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    clear_caches()
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session_factory(engine):
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def db_session(session_factory):
+    async with session_factory() as session:
+        yield session
@@ -0,0 +1,33 @@
+import hashlib
+import itertools
+from typing import Dict, Optional
+
+
+class FakeDriveStorage:
+    """In-memory stand-in for utility.DriveStorage."""
+
+    def __init__(self):
+        self.files: Dict[str, dict] = {}  # id -> {"name", "content", "appProperties"}
+        self.uploads = 0
+        self.downloads = 0
+        self._ids = (f"file-{n}" for n in itertools.count(1))
+
+    def find(self, name: str) -> Optional[dict]:
+        for file_id, file in self.files.items():
+            if file["name"] == name:
+                return {"id": file_id, "name": name, "size": str(len(file["content"])),
+                        "md5Checksum": hashlib.md5(file["content"]).hexdigest(),
+                        "appProperties": dict(file["appProperties"])}
+        return None
+
+    def upload(self, path: str, name: str, file_id: Optional[str] = None, properties: Optional[dict] = None) -> str:
+        with open(path, "rb") as fh:
+            content = fh.read()
+        file_id = file_id or next(self._ids)
+        self.files[file_id] = {"name": name, "content": content, "appProperties": dict(properties or {})}
+        self.uploads += 1
+        return file_id
+
+    def download(self, file_id: str, fh) -> None:
+        fh.write(self.files[file_id]["content"])
+        self.downloads += 1
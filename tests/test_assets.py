@@ -0,0 +1,90 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.assets import AssetFiles, AssetPipeline, minify_css, minify_js, negotiate_encoding
+
+SCRIPT = """// Header comment
+function greet(name) {
+    /* block
+       comment */
+    const row = `
+        <td>${name}</td>
+        <td>${name ? `${name}!` : ""}</td>
+    `;
+
+    return row; // trailing
+}
+""" + "// padding\n" * 30 + "greet('x');\n" * 40
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    (tmp_path / "app.js").write_text(SCRIPT)
+    (tmp_path / "app.css").write_text("/* theme */\nbody {\n    color: red;\n    margin: 0 auto;\n}\n" * 20)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG")
+    pipeline = AssetPipeline(str(tmp_path))
+    pipeline.build()
+    return pipeline
+
+
+@pytest.fixture
+def client(pipeline, tmp_path):
+    app = FastAPI()
+    app.mount("/static", AssetFiles(directory=str(tmp_path), pipeline=pipeline), name="static")
+    return TestClient(app)
+
+
+def test_minify_keeps_template_literals():
+    minified = minify_js(SCRIPT)
+    assert "comment" not in minified and "padding" not in minified
+    assert "function greet(name) {\nconst row = `\n        <td>${name}</td>\n" in minified
+    assert "    `;\nreturn row; // trailing\n}" in minified
+    assert minify_css("a > b ,c {\n  color: red;\n}") == "a>b,c{color:red}"
+
+
+def test_negotiate_encoding():
+    available = {"identity": b"", "gzip": b"", "br": b""}
+    assert negotiate_encoding("gzip, deflate, br", available) == "br"
+    assert negotiate_encoding("br;q=0, gzip", available) == "gzip"
+    assert negotiate_encoding("", available) == "identity"
+    assert negotiate_encoding("br", {"identity": b"", "gzip": b""}) == "identity"
+
+
+def test_fingerprinted_asset_is_immutable_and_compressed(pipeline, client):
+    asset = pipeline.assets["app.js"]
+    assert asset.hashed_name.startswith("app.") and asset.hashed_name != "app.js"
+
+    response = client.get(f"/static/{asset.hashed_name}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == gzip.decompress(asset.variants["gzip"])  # httpx decodes the body
+
+    not_modified = client.get(
+        f"/static/{asset.hashed_name}",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]},
+    )
+    assert not_modified.status_code == 304
+
+
+def test_plain_names_revalidate_and_other_files_fall_through(client):
+    response = client.get("/static/app.css", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+    assert "content-encoding" not in response.headers
+    assert response.text.startswith("body{color:red;margin:0 auto}")
+
+    assert client.get("/static/logo.png").content == b"\x89PNG"
+    assert client.get("/static/missing.js").status_code == 404
+
+
+def test_rewrite_html(pipeline):
+    html = b'<link href="/static/app.css"><script src=\'/static/app.js\'></script><img src="/static/logo.png">'
+    rewritten = pipeline.rewrite_html(html).decode()
+    assert f'"/static/{pipeline.assets["app.css"].hashed_name}"' in rewritten
+    assert f"'/static/{pipeline.assets['app.js'].hashed_name}'" in rewritten
+    assert '"/static/logo.png"' in rewritten
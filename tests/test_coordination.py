@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from backend.coordination import StartupCoordinator
+
+
+@pytest.mark.asyncio
+async def test_one_leader_and_followers_wait_for_setup(tmp_path):
+    # Separate open files conflict under flock even within one process,
+    # so each coordinator stands in for a worker process
+    workers = [StartupCoordinator(str(tmp_path), "app.db") for _ in range(3)]
+    events = []
+
+    async def start(worker, name):
+        async with worker.setup() as is_leader:
+            if is_leader:
+                events.append("setup started")
+                await asyncio.sleep(0.05)
+                events.append("setup done")
+            else:
+                events.append(f"{name} ready")
+
+    await asyncio.gather(*(start(worker, f"worker {i}") for i, worker in enumerate(workers)))
+
+    assert [worker.is_leader for worker in workers].count(True) == 1
+    assert events[:2] == ["setup started", "setup done"]
+    assert len(events) == 4
+
+
+@pytest.mark.asyncio
+async def test_leadership_passes_on_after_release(tmp_path):
+    first = StartupCoordinator(str(tmp_path), "app.db")
+    second = StartupCoordinator(str(tmp_path), "app.db")
+
+    async with first.setup() as is_leader:
+        assert is_leader
+    async with second.setup() as is_leader:
+        assert not is_leader
+
+    first.release()
+    third = StartupCoordinator(str(tmp_path), "app.db")
+    async with third.setup() as is_leader:
+        assert is_leader
+    third.release()
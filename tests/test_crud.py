@@ -1,34 +1,12 @@
 import pytest
-import pytest_asyncio
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, event, update
 from fastapi import HTTPException
 from datetime import date
 
-from backend.database import Base
-from backend.models import UnitType, Site, Material, Payment, Laborer, Attendance
+from backend.models import UnitType, Site, Laborer
 from backend import crud, schemas
-
-# Setup the async test database
-SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
-
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(
-    bind=engine, class_=AsyncSession, expire_on_commit=False
-)
-
-@pytest_asyncio.fixture(scope="function")
-async def db_session():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-    async with TestingSessionLocal() as session:
-        yield session
-
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
+from backend.cache import clear_caches, cache_stats
 
 
 @pytest.fixture
@@ -205,3 +183,462 @@ async def test_create_payment(
     assert payment.amount == test_payment_data.amount
     assert payment.labor_id == laborer.id
     assert payment.site_id == site.id
+
+@pytest.mark.asyncio
+async def test_get_labours_cursor_pagination(db_session: AsyncSession, test_laborer_data: schemas.LaborerCreate):
+    from backend.pagination import next_cursor
+
+    for i in range(5):
+        test_laborer_data.name = f"Worker {i}"
+        await crud.create_labour(db_session, test_laborer_data)
+
+    first_page = await crud.get_labours(db_session, limit=2)
+    cursor = next_cursor(first_page, 2)
+    second_page = await crud.get_labours(db_session, limit=2, cursor=cursor)
+    offset_page = await crud.get_labours(db_session, skip=2, limit=2)
+
+    assert [l.id for l in second_page] == [l.id for l in offset_page]
+    last_page = await crud.get_labours(db_session, limit=2, cursor=next_cursor(second_page, 2))
+    assert [l.name for l in last_page] == ["Worker 4"]
+    assert next_cursor(last_page, 2) is None
+
+@pytest.mark.asyncio
+async def test_get_labours_invalid_cursor(db_session: AsyncSession):
+    with pytest.raises(HTTPException) as exc_info:
+        await crud.get_labours(db_session, cursor="not-a-cursor")
+    assert exc_info.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_search_labours_prefix_match(db_session: AsyncSession, test_laborer_data: schemas.LaborerCreate):
+    for name in ["John Doe", "Johnny Cash", "Jane Doe"]:
+        test_laborer_data.name = name
+        await crud.create_labour(db_session, test_laborer_data)
+
+    assert {l.name for l in await crud.search_labours(db_session, "joh")} == {"John Doe", "Johnny Cash"}
+    assert [l.name for l in await crud.search_labours(db_session, "ja do")] == ["Jane Doe"]
+    assert len(await crud.search_labours(db_session, "doe", limit=1)) == 1
+    assert await crud.search_labours(db_session, "%") == []
+
+@pytest.mark.asyncio
+async def test_search_labours_tracks_update_and_delete(db_session: AsyncSession, test_laborer_data: schemas.LaborerCreate):
+    laborer = await crud.create_labour(db_session, test_laborer_data)
+
+    test_laborer_data.name = "Ravi Kumar"
+    await crud.update_labour(db_session, laborer.id, test_laborer_data)
+    assert await crud.search_labours(db_session, "john") == []
+    assert [l.id for l in await crud.search_labours(db_session, "ravi")] == [laborer.id]
+
+    await crud.delete_labour(db_session, laborer.id)
+    assert await crud.search_labours(db_session, "ravi") == []
+
+@pytest.mark.asyncio
+async def test_create_attendance_bulk(db_session: AsyncSession, test_laborer_data: schemas.LaborerCreate):
+    first = await crud.create_labour(db_session, test_laborer_data)
+    test_laborer_data.name = "Jane Roe"
+    second = await crud.create_labour(db_session, test_laborer_data)
+
+    bulk = schemas.AttendanceBulkCreate(
+        site_name="Test Site",
+        date=date(2023, 10, 11),
+        marks=[
+            schemas.AttendanceMark(laborer_id=first.id, present="Yes", hours_worked=8.0),
+            schemas.AttendanceMark(laborer_id=second.id, present="No", hours_worked=0.0),
+        ]
+    )
+
+    records = await crud.create_attendance_bulk(db_session, bulk)
+    assert [r.laborer_name for r in records] == ["John Doe", "Jane Roe"]
+    assert all(r.id is not None and r.site_name == "Test Site" for r in records)
+    assert await crud.count_all_attendance(db_session) == 2
+
+@pytest.mark.asyncio
+async def test_create_attendance_bulk_unknown_laborer(db_session: AsyncSession):
+    bulk = schemas.AttendanceBulkCreate(
+        site_name="Test Site",
+        date=date(2023, 10, 11),
+        marks=[schemas.AttendanceMark(laborer_id=9999, present="Yes", hours_worked=8.0)]
+    )
+    with pytest.raises(HTTPException) as exc_info:
+        await crud.create_attendance_bulk(db_session, bulk)
+    assert exc_info.value.status_code == 404
+    assert await crud.count_all_attendance(db_session) == 0
+
+@pytest.mark.asyncio
+async def test_create_attendance_is_idempotent(db_session: AsyncSession, test_laborer_data: schemas.LaborerCreate):
+    laborer = await crud.create_labour(db_session, test_laborer_data)
+    attendance_data = schemas.AttendanceCreate(
+        laborer_id=laborer.id,
+        date=date(2023, 10, 10),
+        present="Yes",
+        hours_worked=4.0,
+        site_name="Test Site"
+    )
+
+    first = await crud.create_attendance(db_session, laborer.id, attendance_data)
+    attendance_data.hours_worked = 8.0
+    retried = await crud.create_attendance(db_session, laborer.id, attendance_data)
+
+    assert retried.id == first.id
+    assert retried.hours_worked == 8.0
+    assert await crud.count_all_attendance(db_session) == 1
+
+@pytest.mark.asyncio
+async def test_update_attendance_date_conflict(db_session: AsyncSession, test_laborer_data: schemas.LaborerCreate):
+    laborer = await crud.create_labour(db_session, test_laborer_data)
+    attendance_data = schemas.AttendanceCreate(
+        laborer_id=laborer.id, date=date(2023, 10, 10), present="Yes", hours_worked=8.0, site_name="Test Site"
+    )
+    await crud.create_attendance(db_session, laborer.id, attendance_data)
+    attendance_data.date = date(2023, 10, 11)
+    second = await crud.create_attendance(db_session, laborer.id, attendance_data)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await crud.update_attendance(
+            db_session, second.id,
+            schemas.AttendanceUpdate(present=None, hours_worked=None, date=date(2023, 10, 10), site_name=None)
+        )
+    assert exc_info.value.status_code == 409
+
+@pytest.mark.asyncio
+async def test_attendance_history_range_and_summary(db_session: AsyncSession, test_laborer_data: schemas.LaborerCreate):
+    from backend.pagination import next_date_cursor
+
+    laborer = await crud.create_labour(db_session, test_laborer_data)
+    for day, present, hours in [(1, "Present", 8.0), (2, "Absent", 0.0), (3, "Present", 6.5), (4, "Present", 8.0)]:
+        await crud.create_attendance(db_session, laborer.id, schemas.AttendanceCreate(
+            laborer_id=laborer.id, date=date(2023, 10, day), present=present, hours_worked=hours, site_name="Test Site"
+        ))
+
+    page = await crud.get_attendance_history(db_session, laborer.id, from_date=date(2023, 10, 2), limit=2)
+    assert [r.date.day for r in page] == [2, 3]
+    assert page[0].laborer_name == laborer.name
+    rest = await crud.get_attendance_history(db_session, laborer.id, limit=2, cursor=next_date_cursor(page, 2))
+    assert [r.date.day for r in rest] == [4]
+
+    summary = await crud.get_attendance_summary(db_session, laborer.id, date(2023, 10, 1), date(2023, 10, 3))
+    assert summary.days_present == 2
+    assert summary.days_absent == 1
+    assert summary.hours_worked == 14.5
+
+@pytest.mark.asyncio
+async def test_get_payroll(db_session: AsyncSession, test_laborer_data: schemas.LaborerCreate):
+    laborer = await crud.create_labour(db_session, test_laborer_data)  # daily_wage 500
+    marks = [(1, "Present", 8.0, "Test Site"), (2, "Present", 4.0, "Test Site"),
+             (3, "Absent", 0.0, "Test Site"), (4, "Present", 8.0, "Other Site")]
+    for day, present, hours, site in marks:
+        await crud.create_attendance(db_session, laborer.id, schemas.AttendanceCreate(
+            laborer_id=laborer.id, date=date(2023, 10, day), present=present, hours_worked=hours, site_name=site
+        ))
+
+    sheet = await crud.get_payroll(db_session, date(2023, 10, 1), date(2023, 10, 31), site_name="Test Site")
+    assert len(sheet.entries) == 1
+    entry = sheet.entries[0]
+    assert entry.days_present == 2
+    assert entry.payable_days == 1.5
+    assert entry.amount == 750.0
+    assert sheet.total_amount == 750.0
+
+    all_sites = await crud.get_payroll(db_session, date(2023, 10, 1), date(2023, 10, 31))
+    assert all_sites.total_amount == 1250.0
+
+@pytest.mark.asyncio
+async def test_attendance_daily_rollup_tracks_writes(db_session: AsyncSession, test_laborer_data: schemas.LaborerCreate):
+    first = await crud.create_labour(db_session, test_laborer_data)
+    test_laborer_data.name = "Jane Roe"
+    second = await crud.create_labour(db_session, test_laborer_data)
+
+    await crud.create_attendance_bulk(db_session, schemas.AttendanceBulkCreate(
+        site_name="Test Site",
+        date=date(2023, 10, 10),
+        marks=[
+            schemas.AttendanceMark(laborer_id=first.id, present="Present", hours_worked=8.0),
+            schemas.AttendanceMark(laborer_id=second.id, present="Absent", hours_worked=0.0),
+        ]
+    ))
+    [day] = await crud.get_attendance_daily(db_session, site_name="Test Site")
+    assert (day.present_count, day.absent_count, day.total_hours) == (1, 1, 8.0)
+
+    # Retried mark (upsert) and an edit both adjust the rollup in place
+    mark = await crud.create_attendance(db_session, second.id, schemas.AttendanceCreate(
+        laborer_id=second.id, date=date(2023, 10, 10), present="Present", hours_worked=6.0, site_name="Test Site"
+    ))
+    await crud.update_attendance(db_session, mark.id, schemas.AttendanceUpdate(
+        present=None, hours_worked=None, date=None, site_name="Other Site"
+    ))
+    rollup = {(r.site_name, r.present_count, r.absent_count, r.total_hours) for r in await crud.get_attendance_daily(db_session)}
+    assert rollup == {("Test Site", 1, 0, 8.0), ("Other Site", 1, 0, 6.0)}
+
+    await crud.delete_attendance(db_session, mark.id)
+    assert [r.site_name for r in await crud.get_attendance_daily(db_session)] == ["Test Site"]
+
+    assert await crud.rebuild_attendance_daily(db_session) == 1
+    [day] = await crud.get_attendance_daily(db_session, from_date=date(2023, 10, 10), to_date=date(2023, 10, 10))
+    assert (day.present_count, day.absent_count, day.total_hours) == (1, 0, 8.0)
+
+@pytest.mark.asyncio
+async def test_count_rows_cached_until_write(db_session: AsyncSession, test_site_data: schemas.SiteCreate):
+    assert await crud.count_rows(db_session, Site) == 0
+    await crud.create_site(db_session, test_site_data)
+    assert await crud.count_rows(db_session, Site) == 1
+
+    # A row written behind the crud layer's back is not seen until the next crud write
+    db_session.add(Site(name="Side Door", location="Nowhere"))
+    await db_session.commit()
+    assert await crud.count_rows(db_session, Site) == 1
+    await crud.create_site(db_session, schemas.SiteCreate(name="Third", location="Here"))
+    assert await crud.count_rows(db_session, Site) == 3
+
+@pytest.mark.asyncio
+async def test_entity_cache_read_through_and_invalidation(
+    db_session: AsyncSession, test_laborer_data: schemas.LaborerCreate, test_site_data: schemas.SiteCreate
+):
+    laborer = await crud.create_labour(db_session, test_laborer_data)
+    site = await crud.create_site(db_session, test_site_data)
+
+    # Creates store the row they wrote
+    assert (await crud.get_cached_labour(db_session, laborer.id)).name == test_laborer_data.name
+    assert cache_stats()["laborers"]["hits"] == 1
+    clear_caches()
+
+    assert (await crud.get_cached_labour(db_session, laborer.id)).name == test_laborer_data.name
+    assert (await crud.get_cached_site(db_session, site.id)).name == test_site_data.name
+    stats = cache_stats()
+    assert (stats["laborers"]["misses"], stats["sites"]["misses"]) == (1, 1)
+
+    # Warm lookups are served without touching the database
+    db_session.add(Site(name="Side Door", location="Nowhere"))
+    await db_session.execute(update(Site).where(Site.id == site.id).values(name="Renamed Behind"))
+    await db_session.commit()
+    assert (await crud.get_cached_site(db_session, site.id)).name == test_site_data.name
+    assert cache_stats()["sites"]["hits"] == 1
+
+    # Crud updates store the new row and deletes drop the entry
+    await crud.update_site(db_session, site.id, schemas.SiteCreate(name="Renamed", location="Elsewhere"))
+    assert (await crud.get_cached_site(db_session, site.id)).name == "Renamed"
+    await crud.update_labour(db_session, laborer.id, test_laborer_data.model_copy(update={"name": "Ravi"}))
+    assert (await crud.get_cached_labour(db_session, laborer.id)).name == "Ravi"
+    await crud.delete_labour(db_session, laborer.id)
+    assert await crud.get_cached_labour(db_session, laborer.id) is None
+
+@pytest.mark.asyncio
+async def test_existence_checks_ignore_stale_cache(
+    db_session: AsyncSession,
+    test_laborer_data: schemas.LaborerCreate,
+    test_site_data: schemas.SiteCreate,
+    test_material_data: schemas.MaterialCreate
+):
+    laborer = await crud.create_labour(db_session, test_laborer_data)
+    site = await crud.create_site(db_session, test_site_data)
+
+    # Deleted by another worker: this process still has both rows cached
+    await db_session.execute(delete(Laborer).where(Laborer.id == laborer.id))
+    await db_session.execute(delete(Site).where(Site.id == site.id))
+    await db_session.commit()
+    db_session.expunge_all()
+    assert await crud.get_cached_labour(db_session, laborer.id) is not None
+
+    assert await crud.get_labour(db_session, laborer.id) is None
+    bulk = schemas.AttendanceBulkCreate(
+        site_name="Test Site", date=date(2023, 10, 11),
+        marks=[schemas.AttendanceMark(laborer_id=laborer.id, present="Yes", hours_worked=8.0)]
+    )
+    for write in (
+        crud.get_site(db_session, site.id),
+        crud.create_attendance_bulk(db_session, bulk),
+        crud.create_material(db_session, test_material_data.model_copy(update={"site_id": site.id})),
+    ):
+        with pytest.raises(HTTPException) as exc_info:
+            await write
+        assert exc_info.value.status_code == 404
+
+@pytest.mark.asyncio
+async def test_create_material_reads_site_name_from_cache(
+    engine,
+    db_session: AsyncSession,
+    test_site_data: schemas.SiteCreate,
+    test_material_data: schemas.MaterialCreate
+):
+    site = await crud.create_site(db_session, test_site_data)
+    test_material_data.site_id = site.id
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        material = await crud.create_material(db_session, test_material_data)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+    assert material.site_name == site.name
+    assert [statement.split()[0] for statement in statements] == ["INSERT"]
+
+@pytest.mark.asyncio
+async def test_payment_names_from_cache(
+    db_session: AsyncSession,
+    test_laborer_data: schemas.LaborerCreate,
+    test_site_data: schemas.SiteCreate,
+    test_payment_data: schemas.PaymentCreate
+):
+    laborer = await crud.create_labour(db_session, test_laborer_data)
+    site = await crud.create_site(db_session, test_site_data)
+    test_payment_data.labor_id = laborer.id
+    test_payment_data.site_id = site.id
+    for _ in range(3):
+        await crud.create_payment(db_session, test_payment_data)
+    clear_caches()
+
+    # List pages join the names in SQL
+    payments = await crud.get_payments(db_session)
+    assert [(p.labor_name, p.site_name) for p in payments] == [(laborer.name, site.name)] * 3
+    assert cache_stats()["laborers"]["misses"] == 0
+
+    # Single payments read them through the cache: one miss, then hits
+    for payment in payments[:2]:
+        payment = await crud.get_payment(db_session, payment.id)
+        assert (payment.labor_name, payment.site_name) == (laborer.name, site.name)
+    stats = cache_stats()
+    assert (stats["laborers"]["misses"], stats["laborers"]["hits"]) == (1, 1)
+
+@pytest.mark.asyncio
+async def test_writes_are_single_returning_statements(
+    engine,
+    db_session: AsyncSession,
+    test_laborer_data: schemas.LaborerCreate,
+    test_site_data: schemas.SiteCreate,
+    test_material_data: schemas.MaterialCreate,
+    test_payment_data: schemas.PaymentCreate
+):
+    laborer = await crud.create_labour(db_session, test_laborer_data)
+    site = await crud.create_site(db_session, test_site_data)
+    test_material_data.site_id = site.id
+    material = await crud.create_material(db_session, test_material_data)
+    attendance = await crud.create_attendance(db_session, laborer.id, schemas.AttendanceCreate(
+        laborer_id=laborer.id, date=date(2023, 10, 10), present="Yes", hours_worked=8.0, site_name=site.name
+    ))
+    test_payment_data.labor_id = laborer.id
+    test_payment_data.site_id = site.id
+    payment = await crud.create_payment(db_session, test_payment_data)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        # Names come from the warm lookup caches; existence checks still read the database
+        await crud.create_payment(db_session, test_payment_data)
+        test_site_data.location = "Moved"
+        updated_site = await crud.update_site(db_session, site.id, test_site_data)
+        test_laborer_data.daily_wage = 650.0
+        updated_laborer = await crud.update_labour(db_session, laborer.id, test_laborer_data)
+        test_payment_data.amount = 75.0
+        updated_payment = await crud.update_payment(db_session, payment.id, test_payment_data)
+        test_material_data.quantity = 40.0
+        updated_material = await crud.update_material(db_session, material.id, test_material_data)
+        updated_attendance = await crud.update_attendance(
+            db_session, attendance.id, schemas.AttendanceUpdate(present=None, hours_worked=6.0, date=None, site_name=None)
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+    writes = [statement for statement in statements if statement.split()[0] in ("INSERT", "UPDATE", "DELETE")]
+    assert [statement.split()[0] for statement in writes] == ["INSERT"] + ["UPDATE"] * 5
+    assert all(" RETURNING " in statement for statement in writes)
+    assert updated_site.location == "Moved"
+    assert updated_laborer.daily_wage == 650.0
+    assert (updated_payment.amount, updated_payment.labor_name) == (75.0, laborer.name)
+    assert (updated_material.quantity, updated_material.site_name) == (40.0, site.name)
+    assert (updated_attendance.hours_worked, updated_attendance.laborer_name) == (6.0, laborer.name)
+
+@pytest.mark.asyncio
+async def test_dashboard_summary(
+    db_session: AsyncSession,
+    test_laborer_data: schemas.LaborerCreate,
+    test_site_data: schemas.SiteCreate,
+    test_material_data: schemas.MaterialCreate,
+):
+    today = date(2023, 10, 18)  # A Wednesday
+    laborer = await crud.create_labour(db_session, test_laborer_data)
+    site = await crud.create_site(db_session, test_site_data)
+    test_material_data.site_id = site.id
+    await crud.create_material(db_session, test_material_data)
+    await crud.create_material(db_session, test_material_data)
+    await crud.create_attendance(db_session, laborer.id, schemas.AttendanceCreate(
+        laborer_id=laborer.id, date=today, present="Present", hours_worked=8.0, site_name=site.name
+    ))
+    for day, amount in [(2, 100.0), (16, 200.0), (18, 300.0)]:
+        await crud.create_payment(db_session, schemas.PaymentCreate(
+            amount=amount, date=date(2023, 10, day), labor_id=laborer.id, site_id=site.id
+        ))
+
+    summary = await crud.get_dashboard_summary(db_session, today)
+    assert summary.total_laborers == 1
+    assert summary.active_laborers == 1
+    assert [(d.site_name, d.present_count) for d in summary.attendance_today] == [(site.name, 1)]
+    assert [(m.site_name, m.quantity) for m in summary.material_stock] == [(site.name, 201.0)]
+    assert (summary.payments_week, summary.payments_month) == (500.0, 600.0)
+
+    # Served from cache until the next write
+    assert await crud.get_dashboard_summary(db_session, today) is summary
+    await crud.create_labour(db_session, test_laborer_data)
+    assert (await crud.get_dashboard_summary(db_session, today)).total_laborers == 2
+
+@pytest.mark.asyncio
+async def test_material_stock_ledger(db_session: AsyncSession, test_site_data: schemas.SiteCreate, test_material_data: schemas.MaterialCreate):
+    site = await crud.create_site(db_session, test_site_data)
+    other = await crud.create_site(db_session, schemas.SiteCreate(name="Other Site", location="456 Test Ave"))
+    site_id, other_id = site.id, other.id  # Refused writes roll back, which expires both
+    test_material_data.site_id = site.id
+    material = await crud.create_material(db_session, test_material_data)  # 100.5 bags arrive
+
+    async def balance(site_id):
+        return {(s.material_name, s.unit): s.quantity for s in await crud.get_site_stock(db_session, site_id)}
+
+    assert await balance(site.id) == {("Cement", UnitType.bag): 100.5}
+
+    await crud.create_material_movement(db_session, schemas.MaterialMovementCreate(
+        site_id=site.id, material_name="Cement", unit=UnitType.bag, quantity=20.5,
+        movement_type="consumption", date=date(2023, 10, 2)
+    ))
+    await crud.create_material_movement(db_session, schemas.MaterialMovementCreate(
+        site_id=site.id, to_site_id=other.id, material_name="Cement", unit=UnitType.bag, quantity=30.0,
+        movement_type="transfer", date=date(2023, 10, 3)
+    ))
+    assert await balance(site.id) == {("Cement", UnitType.bag): 50.0}
+    assert await balance(other.id) == {("Cement", UnitType.bag): 30.0}
+
+    with pytest.raises(HTTPException) as exc_info:
+        await crud.create_material_movement(db_session, schemas.MaterialMovementCreate(
+            site_id=other.id, material_name="Cement", unit=UnitType.bag, quantity=31.0,
+            movement_type="consumption", date=date(2023, 10, 4)
+        ))
+    assert exc_info.value.status_code == 409
+
+    # Editing the arrival record moves the balance with it, but not below what was drawn from it
+    test_material_data.quantity = 60.0
+    await crud.update_material(db_session, material.id, test_material_data)
+    assert await balance(site.id) == {("Cement", UnitType.bag): 9.5}
+    test_material_data.quantity = 40.0
+    with pytest.raises(HTTPException) as exc_info:
+        await crud.update_material(db_session, material.id, test_material_data)
+    assert exc_info.value.status_code == 409
+    with pytest.raises(HTTPException) as exc_info:
+        await crud.delete_material(db_session, material.id)
+    assert exc_info.value.status_code == 409
+    assert await balance(site_id) == {("Cement", UnitType.bag): 9.5}
+    assert (await crud.get_material(db_session, material.id)).quantity == 60.0
+    assert len(await crud.get_material_movements(db_session, site_id=other_id)) == 1
+
+@pytest.mark.asyncio
+async def test_material_summary_normalizes_units(db_session: AsyncSession, test_site_data: schemas.SiteCreate, test_material_data: schemas.MaterialCreate):
+    site = await crud.create_site(db_session, test_site_data)
+    test_material_data.site_id = site.id
+    for quantity, unit in [(2.0, UnitType.bag), (1.0, UnitType.ton), (500.0, UnitType.kg), (3.0, UnitType.crate)]:
+        test_material_data.quantity = quantity
+        test_material_data.unit = unit
+        await crud.create_material(db_session, test_material_data)
+
+    summary = await crud.get_material_summary(db_session, site.id)
+    totals = {(t.material_name, t.dimension, t.unit): t.quantity for t in summary.totals}
+    assert totals == {
+        ("Cement", "mass", UnitType.kg): 1600.0,  # 2 bags of 50 kg + 1 t + 500 kg
+        ("Cement", "crate", UnitType.crate): 3.0,  # No known size, kept as recorded
+    }
@@ -1,9 +1,10 @@
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 from datetime import date
 
 from backend.crud import create_labour
 from backend.schemas import LaborerCreate
+from backend.models import Laborer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException
@@ -21,26 +22,31 @@ async def test_create_labour_success():
         date_of_joining=date.today()
     )
 
+    returned = Laborer(id=1, **labour_data.model_dump())
+    mock_db.scalars.return_value = MagicMock(one_or_none=MagicMock(return_value=returned))
+
     # Act
     result = await create_labour(mock_db, labour_data)
 
     # Assert
+    assert result.id == 1
     assert result.name == "Test Labour"
     assert result.age == 30
     assert result.gender == "Male"
     assert result.daily_wage == 500.0
 
-    mock_db.add.assert_called_once()
-    mock_db.flush.assert_called_once()
+    # A single INSERT ... RETURNING, with no refresh after the commit
+    stmt = mock_db.scalars.call_args.args[0]
+    assert stmt.is_insert and stmt._returning
     mock_db.commit.assert_called_once()
-    mock_db.refresh.assert_called_once()
+    mock_db.refresh.assert_not_called()
 
 @pytest.mark.asyncio
 async def test_create_labour_sqlalchemy_error():
     # Arrange
     mock_db = AsyncMock(spec=AsyncSession)
     mock_db.commit.side_effect = SQLAlchemyError("Mocked database error")
-    mock_db.flush.side_effect = SQLAlchemyError("Mocked database error")
+    mock_db.scalars.side_effect = SQLAlchemyError("Mocked database error")
 
     labour_data = LaborerCreate(
         name="Test Labour",
@@ -0,0 +1,141 @@
+import sqlite3
+
+import pytest
+from datetime import date
+from fastapi import HTTPException
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from backend.database import Base, apply_sqlite_pragmas, read_only_pragmas, read_only_url, sqlite_pragmas
+from backend.models import Material, MaterialStock, Site, UnitType, MovementType
+from backend import crud, schemas
+
+
+def test_profiles_and_overrides():
+    assert sqlite_pragmas()["synchronous"] == "NORMAL"
+    assert sqlite_pragmas("durable")["synchronous"] == "FULL"
+    assert sqlite_pragmas("minimal") == {"journal_mode": "WAL"}
+
+    pragmas = sqlite_pragmas("balanced", "cache_size=-65536, mmap_size=0")
+    assert pragmas["cache_size"] == "-65536"
+    assert pragmas["mmap_size"] == "0"
+
+    with pytest.raises(ValueError):
+        sqlite_pragmas("turbo")
+
+
+@pytest.mark.asyncio
+async def test_pragmas_applied_per_connection(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    apply_sqlite_pragmas(engine, sqlite_pragmas())
+    try:
+        async with engine.connect() as conn:
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+            assert (await conn.execute(text("PRAGMA foreign_keys"))).scalar() == 1
+            assert (await conn.execute(text("PRAGMA busy_timeout"))).scalar() == 5000
+            assert (await conn.execute(text("PRAGMA temp_store"))).scalar() == 2  # MEMORY
+    finally:
+        await engine.dispose()
+
+
+async def add_site_with_material(db, name):
+    site = await crud.create_site(db, schemas.SiteCreate(name=name, location="Pune"))
+    material = await crud.create_material(db, schemas.MaterialCreate(
+        name="Cement", quantity=10, unit=UnitType.kg, site_id=site.id,
+        arrival_date=date(2024, 1, 1), transport_type=None,
+    ))
+    return site, material
+
+
+@pytest.mark.asyncio
+async def test_delete_site_detaches_materials(db_session):
+    site, material = await add_site_with_material(db_session, "North")
+
+    assert await crud.delete_site(db_session, site.id) is True
+
+    assert (await db_session.get(Material, material.id)).site_id is None
+    assert (await db_session.get(MaterialStock, (site.id, "Cement", UnitType.kg))) is None
+
+
+@pytest.mark.asyncio
+async def test_delete_site_with_ledger_history_is_refused(db_session):
+    site, _ = await add_site_with_material(db_session, "North")
+    site_id = site.id
+    await crud.create_material_movement(db_session, schemas.MaterialMovementCreate(
+        site_id=site_id, material_name="Cement", unit=UnitType.kg, quantity=4,
+        movement_type=MovementType.consumption, date=date(2024, 1, 2),
+    ))
+
+    with pytest.raises(HTTPException) as exc:
+        await crud.delete_site(db_session, site_id)
+    assert exc.value.status_code == 409
+    assert (await db_session.execute(select(Site.name).where(Site.id == site_id))).scalar_one() == "North"
+
+
+@pytest.mark.asyncio
+async def test_payment_references_are_checked(db_session):
+    site, _ = await add_site_with_material(db_session, "North")
+    laborer = await crud.create_labour(db_session, schemas.LaborerCreate(
+        name="Asha", age=30, gender="F", daily_wage=500, date_of_joining=date(2024, 1, 1)
+    ))
+    payment = schemas.PaymentCreate(amount=100, date=date(2024, 1, 5), labor_id=999, site_id=site.id)
+
+    for write in (
+        crud.create_payment(db_session, payment),
+        crud.create_payment(db_session, payment.model_copy(update={"labor_id": laborer.id, "site_id": 999})),
+    ):
+        with pytest.raises(HTTPException) as exc:
+            await write
+        assert exc.value.status_code == 404
+
+    created = await crud.create_payment(db_session, payment.model_copy(update={"labor_id": laborer.id}))
+    with pytest.raises(HTTPException) as exc:
+        await crud.update_payment(db_session, created.id, schemas.PaymentUpdate(**payment.model_dump()))
+    assert exc.value.status_code == 404
+
+    # Payments are kept, so the laborer cannot be deleted under them
+    with pytest.raises(HTTPException) as exc:
+        await crud.delete_labour(db_session, laborer.id)
+    assert exc.value.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_read_only_engine_sees_commits_and_refuses_writes(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'app.db'}"
+    writer = create_async_engine(url)
+    apply_sqlite_pragmas(writer, sqlite_pragmas())
+    reader = create_async_engine(read_only_url(url))
+    apply_sqlite_pragmas(reader, read_only_pragmas(sqlite_pragmas()))
+    try:
+        async with writer.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(text("INSERT INTO sites (name) VALUES ('North')"))
+
+        async with reader.connect() as conn:
+            assert (await conn.execute(text("SELECT name FROM sites"))).scalars().all() == ["North"]
+            with pytest.raises(OperationalError, match="readonly"):
+                await conn.execute(text("INSERT INTO sites (name) VALUES ('South')"))
+    finally:
+        await reader.dispose()
+        await writer.dispose()
+
+
+@pytest.mark.asyncio
+async def test_read_only_engine_opens_database_not_yet_in_wal(tmp_path):
+    path = tmp_path / "app.db"
+    conn = sqlite3.connect(path)  # Rollback journal, as before the writer first connects
+    conn.execute("CREATE TABLE sites (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("INSERT INTO sites (name) VALUES ('North')")
+    conn.commit()
+    conn.close()
+
+    reader = create_async_engine(read_only_url(f"sqlite+aiosqlite:///{path}"))
+    apply_sqlite_pragmas(reader, read_only_pragmas(sqlite_pragmas()))
+    try:
+        async with reader.connect() as conn:
+            assert (await conn.execute(text("SELECT name FROM sites"))).scalars().all() == ["North"]
+            assert (await conn.execute(text("PRAGMA query_only"))).scalar() == 1
+    finally:
+        await reader.dispose()
@@ -0,0 +1,202 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import time
+
+import pytest
+
+from backend import utility
+from tests.fake_drive import FakeDriveStorage
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "app.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE sites (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("INSERT INTO sites (name) VALUES ('North')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def read_sites(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [name for (name,) in conn.execute("SELECT name FROM sites ORDER BY id")]
+    finally:
+        conn.close()
+
+
+@pytest.mark.asyncio
+async def test_backup_skips_unchanged_and_updates_in_place(db_path, tmp_path):
+    drive = FakeDriveStorage()
+    backup = utility.DriveBackup(drive, db_path, "app.db.gz")
+
+    assert await backup.run_once() is True
+    assert await backup.run_once() is False  # Same content, no upload
+    assert drive.uploads == 1
+
+    # A write that sits in the WAL is still captured by the snapshot
+    writer = sqlite3.connect(db_path)
+    writer.execute("INSERT INTO sites (name) VALUES ('South')")
+    writer.commit()
+    assert await backup.run_once() is True
+    writer.close()
+
+    assert drive.uploads == 2
+    assert len(drive.files) == 1  # Updated in place, not re-created
+    (stored,) = drive.files.values()
+    restored = tmp_path / "restored.db"
+    restored.write_bytes(gzip.decompress(stored["content"]))
+    assert read_sites(str(restored)) == ["North", "South"]
+    assert stored["appProperties"]["sha256"] == backup.last_hash
+
+
+@pytest.mark.asyncio
+async def test_new_process_picks_up_existing_backup(db_path):
+    drive = FakeDriveStorage()
+    await utility.DriveBackup(drive, db_path, "app.db.gz").run_once()
+
+    # After a restart the hash on Drive gates the first backup
+    assert await utility.DriveBackup(drive, db_path, "app.db.gz").run_once() is False
+    assert drive.uploads == 1
+
+
+@pytest.mark.asyncio
+async def test_restore_skipped_when_local_is_current(db_path, tmp_path):
+    drive = FakeDriveStorage()
+    backup = utility.DriveBackup(drive, db_path, "app.db.gz")
+    await backup.run_once()
+
+    assert await utility.restore_from_drive(drive, db_path, "app.db.gz") == backup.last_hash
+    assert drive.downloads == 0
+
+    fresh = str(tmp_path / "fresh.db")
+    assert await utility.restore_from_drive(drive, fresh, "app.db.gz") == backup.last_hash
+    assert read_sites(fresh) == ["North"]
+
+
+def make_stale_copy(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE sites (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("INSERT INTO sites (name) VALUES ('Stale')")
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.asyncio
+async def test_restore_replaces_older_local_copy(db_path, tmp_path):
+    drive = FakeDriveStorage()
+    backup = utility.DriveBackup(drive, db_path, "app.db.gz")
+    await backup.run_once()
+
+    stale = str(tmp_path / "stale.db")
+    make_stale_copy(stale)
+    open(stale + "-wal", "wb").close()  # Must not be replayed onto the restored file
+
+    assert await utility.restore_from_drive(drive, stale, "app.db.gz") == backup.last_hash
+    assert not os.path.exists(stale + "-wal")
+    assert read_sites(stale) == ["North"]
+    assert sorted(os.listdir(tmp_path)) == ["app.db", "stale.db"]  # No temp files left behind
+
+
+@pytest.mark.asyncio
+async def test_restore_replaces_stale_copy_with_recent_mtime(db_path, tmp_path):
+    drive = FakeDriveStorage()
+    await utility.DriveBackup(drive, db_path, "app.db.gz").run_once()
+
+    # The copy shipped in the image: different content, mtime newer than the backup
+    shipped = str(tmp_path / "shipped.db")
+    make_stale_copy(shipped)
+    future = time.time() + 86400
+    os.utime(shipped, (future, future))
+
+    synced = await utility.restore_from_drive(drive, shipped, "app.db.gz")
+    assert synced is not None
+    assert read_sites(shipped) == ["North"]
+
+    # The startup backup then has nothing new to upload
+    assert await utility.DriveBackup(drive, shipped, "app.db.gz", synced_hash=synced).run_once() is False
+    assert drive.uploads == 1
+
+
+@pytest.mark.asyncio
+async def test_backup_never_overwrites_unverified_remote(db_path, tmp_path):
+    drive = FakeDriveStorage()
+    await utility.DriveBackup(drive, db_path, "app.db.gz").run_once()
+    (stored,) = drive.files.values()
+    good = stored["content"]
+
+    # Restore failed or was skipped, leaving the shipped copy in place
+    shipped = str(tmp_path / "shipped.db")
+    make_stale_copy(shipped)
+    backup = utility.DriveBackup(drive, shipped, "app.db.gz")
+    assert await backup.run_once() is False
+    assert await backup.run_once() is False
+    assert drive.uploads == 1
+    assert stored["content"] == good
+
+    # The same applies to the uncompressed copy earlier versions kept
+    legacy_drive = FakeDriveStorage()
+    legacy_drive.upload(db_path, "app.db")
+    assert await utility.DriveBackup(legacy_drive, shipped, "app.db.gz", legacy_name="app.db").run_once() is False
+    assert legacy_drive.uploads == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("tamper", ["checksum", "content", "integrity"])
+async def test_restore_rejects_bad_backup(db_path, tmp_path, tamper):
+    drive = FakeDriveStorage()
+    await utility.DriveBackup(drive, db_path, "app.db.gz").run_once()
+    (stored,) = drive.files.values()
+    if tamper == "checksum":
+        stored["appProperties"]["sha256"] = "0" * 64
+    elif tamper == "content":
+        stored["content"] = stored["content"][:-8] + b"\0" * 8  # Corrupt gzip trailer
+    else:
+        garbage = b"SQLite format 3\0" + b"\xff" * 4080
+        stored["content"] = gzip.compress(garbage)
+        stored["appProperties"]["sha256"] = hashlib.sha256(garbage).hexdigest()
+
+    stale = str(tmp_path / "stale.db")
+    make_stale_copy(stale)
+    assert await utility.restore_from_drive(drive, stale, "app.db.gz") is None
+    assert read_sites(stale) == ["Stale"]  # Left exactly as it was
+
+
+@pytest.mark.asyncio
+async def test_restore_falls_back_to_uncompressed_copy(db_path, tmp_path):
+    # Drive as earlier versions left it: the plain database, no .gz backup yet
+    drive = FakeDriveStorage()
+    drive.upload(db_path, "app.db")
+
+    # Restored even over a newer local file, which is the copy shipped in the image
+    shipped = str(tmp_path / "shipped.db")
+    make_stale_copy(shipped)
+    synced = await utility.restore_from_drive(drive, shipped, "app.db.gz", "app.db")
+    assert synced is not None
+    assert read_sites(shipped) == ["North"]
+
+    # Once a compressed backup exists the uncompressed copy is ignored
+    backup = utility.DriveBackup(drive, shipped, "app.db.gz", synced_hash=synced, legacy_name="app.db")
+    assert await backup.run_once() is True
+    drive.files["file-1"]["content"] = b"SQLite format 3\0" + b"\xff" * 4080
+    assert await utility.restore_from_drive(drive, str(tmp_path / "fresh.db"), "app.db.gz", "app.db") == backup.last_hash
+    assert read_sites(str(tmp_path / "fresh.db")) == ["North"]
+
+
+@pytest.mark.asyncio
+async def test_restore_rejects_bad_uncompressed_copy(tmp_path):
+    garbage = tmp_path / "garbage.db"
+    garbage.write_bytes(b"SQLite format 3\0" + b"\xff" * 4080)
+    drive = FakeDriveStorage()
+    drive.upload(str(garbage), "app.db")
+
+    stale = str(tmp_path / "stale.db")
+    make_stale_copy(stale)
+    assert await utility.restore_from_drive(drive, stale, "app.db.gz", "app.db") is None
+    assert read_sites(stale) == ["Stale"]
@@ -0,0 +1,75 @@
+import io
+import pytest
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import crud, schemas, exporter
+from backend.models import UnitType
+
+
+@pytest.fixture(autouse=True)
+def small_export_batches(monkeypatch, session_factory):
+    monkeypatch.setattr(exporter, "ReadSessionLocal", session_factory)
+    monkeypatch.setattr(exporter, "EXPORT_BATCH_SIZE", 2)
+
+
+async def collect(chunks):
+    return b"".join([chunk async for chunk in chunks]).decode()
+
+
+@pytest.mark.asyncio
+async def test_export_attendance_csv_in_batches(db_session: AsyncSession):
+    marks = []
+    for i in range(3):
+        laborer = await crud.create_labour(db_session, schemas.LaborerCreate(
+            name=f"Worker {i}", age=30, gender="Male", daily_wage=500.0, date_of_joining=date(2023, 1, 1)
+        ))
+        marks.append(schemas.AttendanceMark(laborer_id=laborer.id, present="Present", hours_worked=8.0))
+    for site_name in ["Site A", "Site B"]:
+        await crud.create_attendance_bulk(db_session, schemas.AttendanceBulkCreate(
+            site_name=site_name, date=date(2023, 10, 1 if site_name == "Site A" else 2), marks=marks
+        ))
+
+    chunks = []
+    async for chunk in exporter.stream_export("attendance", "csv", site="Site A"):
+        chunks.append(chunk)
+    lines = b"".join(chunks).decode().splitlines()
+
+    assert len(chunks) == 2  # Two batches of at most two rows
+    assert lines[0] == "id,laborer_id,laborer_name,date,present,hours_worked,site_name"
+    assert [line.split(",")[2] for line in lines[1:]] == ["Worker 0", "Worker 1", "Worker 2"]
+
+    ndjson = await collect(exporter.stream_export("attendance", "ndjson", from_date=date(2023, 10, 2)))
+    assert ndjson.count("\n") == 3
+    assert '"site_name": "Site B"' in ndjson
+
+
+@pytest.mark.asyncio
+async def test_export_empty_csv_has_header(db_session: AsyncSession):
+    assert await collect(exporter.stream_export("payments", "csv")) == (
+        "id,date,amount,labor_id,labor_name,site_id,site_name,material_name,description\r\n"
+    )
+
+
+@pytest.mark.asyncio
+async def test_export_materials_parquet_round_trip(db_session: AsyncSession):
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    site = await crud.create_site(db_session, schemas.SiteCreate(name="Site A", location="North"))
+    for i, unit in enumerate([UnitType.bag, UnitType.kg, UnitType.ton]):
+        await crud.create_material(db_session, schemas.MaterialCreate(
+            name=f"Material {i}", quantity=10.0 * (i + 1), unit=unit, site_id=site.id,
+            arrival_date=date(2023, 10, i + 1), transport_type=None
+        ))
+
+    chunks = [chunk async for chunk in exporter.stream_export("materials", "parquet")]
+    parquet = pyarrow_parquet.ParquetFile(io.BytesIO(b"".join(chunks)))
+
+    assert parquet.metadata.num_row_groups == 2  # One per batch of at most two rows
+    table = parquet.read()
+    assert str(table.schema.field("arrival_date").type) == "date32[day]"
+    assert str(table.schema.field("transport_type").type) == "string"  # All NULL, typed all the same
+    rows = table.to_pylist()
+    assert [(row["name"], row["unit"], row["quantity"], row["site_name"]) for row in rows] == [
+        ("Material 0", "bag", 10.0, "Site A"), ("Material 1", "kg", 20.0, "Site A"), ("Material 2", "ton", 30.0, "Site A")
+    ]
+    assert rows[2]["arrival_date"] == date(2023, 10, 3)
@@ -0,0 +1,62 @@
+import io
+import json
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import Laborer, Site, Payment, Material
+from backend.importer import import_rows
+
+
+async def count(db, model):
+    return (await db.execute(select(func.count()).select_from(model))).scalar()
+
+
+@pytest.mark.asyncio
+async def test_import_labours_csv_reports_bad_rows(db_session: AsyncSession):
+    upload = io.BytesIO(
+        b"name,age,gender,daily_wage,date_of_joining\n"
+        b"Asha,29,Female,650,2023-01-02\n"
+        b"Bad Age,abc,Male,500,2023-01-02\n"
+        b"\"Kumar, Ravi\",41,Male,700,2023-02-10\n"
+    )
+    report = await import_rows(db_session, "labours", upload, "csv")
+
+    assert (report.imported, report.failed) == (2, 1)
+    assert report.errors[0].row == 2
+    assert report.errors[0].errors[0].startswith("age:")
+    assert await count(db_session, Laborer) == 2
+
+
+@pytest.mark.asyncio
+async def test_import_payments_ndjson_checks_references(db_session: AsyncSession):
+    await import_rows(db_session, "sites", io.BytesIO(b"name,location\nSite A,North\nSite A,Dup\n"), "csv")
+    await import_rows(db_session, "labours", io.BytesIO(
+        b'{"name": "Asha", "age": 29, "gender": "Female", "daily_wage": 650, "date_of_joining": "2023-01-02"}\n'
+    ), "ndjson")
+    lines = [
+        {"amount": 100, "date": "2023-03-01", "labor_id": 1, "site_id": 1},
+        {"amount": 100, "date": "2023-03-01", "labor_id": 99, "site_id": 1},
+    ]
+    upload = io.BytesIO(("\n".join(json.dumps(line) for line in lines) + "\nnot json\n").encode())
+    report = await import_rows(db_session, "payments", upload, "ndjson")
+
+    assert (report.imported, report.failed) == (1, 2)
+    assert [e.row for e in report.errors] == [2, 3]
+    assert await count(db_session, Site) == 1
+    assert await count(db_session, Payment) == 1
+
+
+@pytest.mark.asyncio
+async def test_import_materials_without_transport(db_session: AsyncSession):
+    await import_rows(db_session, "sites", io.BytesIO(b"name,location\nSite A,North\n"), "csv")
+    upload = io.BytesIO(
+        b"name,quantity,unit,site_id,arrival_date,transport_type\n"
+        b"Cement,50,bag,1,2023-03-01,\n"
+        b"Sand,2,ton,1,2023-03-02,Truck\n"
+    )
+    report = await import_rows(db_session, "materials", upload, "csv")
+
+    assert (report.imported, report.failed) == (2, 0)
+    transports = (await db_session.execute(select(Material.transport_type).order_by(Material.id))).scalars().all()
+    assert transports == [None, "Truck"]
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.pages import PageCache
+
+
+@pytest.fixture
+def page_dir(tmp_path):
+    (tmp_path / "index.html").write_text("<h1>v1</h1>")
+    return tmp_path
+
+
+@pytest.fixture
+def client(page_dir):
+    app = FastAPI()
+    cache = PageCache(str(page_dir), check_interval=0)
+
+    @app.get("/")
+    async def index(request: Request):
+        return await cache.response(request, "index.html")
+
+    return TestClient(app)
+
+
+def test_page_served_with_validators(client):
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.text == "<h1>v1</h1>"
+    assert response.headers["content-type"] == "text/html; charset=utf-8"
+    assert response.headers["etag"].startswith('"')
+    assert "last-modified" in response.headers
+
+
+def test_conditional_get_returns_304(client):
+    first = client.get("/")
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    assert client.get("/", headers={"If-Modified-Since": last_modified}).status_code == 304
+    # A stale ETag wins over a matching date
+    stale = client.get("/", headers={"If-None-Match": '"stale"', "If-Modified-Since": last_modified})
+    assert stale.status_code == 200
+
+
+def test_page_reloaded_when_mtime_changes(client, page_dir):
+    etag = client.get("/").headers["etag"]
+
+    page = page_dir / "index.html"
+    page.write_text("<h1>version 2</h1>")
+    stat = page.stat()
+    os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.text == "<h1>version 2</h1>"
+    assert response.headers["etag"] != etag
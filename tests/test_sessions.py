@@ -0,0 +1,66 @@
+import time
+
+import pytest
+from sqlalchemy import select
+
+from backend.models import AdminSession
+from backend.sessions import SessionStore, SQLiteSessionStore, SignedTokenStore
+
+
+@pytest.mark.asyncio
+async def test_sqlite_sessions_shared_between_stores(session_factory):
+    # Two stores over one database behave like two worker processes
+    worker_a = SQLiteSessionStore(session_factory, ttl=60, cache_ttl=0.01)
+    worker_b = SQLiteSessionStore(session_factory, ttl=60, cache_ttl=0.01)
+
+    token = await worker_a.create("admin")
+    assert await worker_a.get(token) == "admin"
+    assert await worker_b.get(token) == "admin"
+    assert await worker_b.get("forged") is None
+    assert await worker_b.get(None) is None
+
+    async with session_factory() as db:
+        stored = (await db.execute(select(AdminSession.token_hash))).scalars().all()
+    assert stored and token not in stored  # Only the hash is kept
+
+    await worker_a.delete(token)
+    time.sleep(0.02)  # Let worker B's cached copy lapse
+    assert await worker_a.get(token) is None
+    assert await worker_b.get(token) is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_sessions_expire_and_are_swept(session_factory):
+    store = SQLiteSessionStore(session_factory, ttl=60)
+    live = await store.create("admin")
+    expired = await store.create("admin")
+    async with session_factory() as db:
+        row = await db.get(AdminSession, store._hash(expired))
+        row.expires_at = time.time() - 1
+        await db.commit()
+    store.cache.clear()
+
+    assert await store.get(expired) is None
+    assert await store.sweep() == 1
+    assert await store.get(live) == "admin"
+
+
+@pytest.mark.asyncio
+async def test_signed_tokens():
+    store = SignedTokenStore("secret", ttl=60)
+    other_worker = SignedTokenStore("secret", ttl=60)
+
+    token = await store.create("admin")
+    assert await other_worker.get(token) == "admin"
+    assert await SignedTokenStore("other secret").get(token) is None
+    assert await store.get(token[:-2] + "xx") is None
+    assert await SignedTokenStore("secret", ttl=-1).get(token) is None  # Expired
+
+
+def test_incomplete_store_fails_at_construction():
+    class CreateOnly(SessionStore):
+        async def create(self, username: str) -> str:
+            return username
+
+    with pytest.raises(TypeError):
+        CreateOnly()
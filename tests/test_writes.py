@@ -0,0 +1,159 @@
+import asyncio
+from datetime import date
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base, apply_sqlite_pragmas, sqlite_pragmas
+from backend.models import Attendance, Laborer
+from backend.writes import WriteQueue
+from backend import crud, schemas
+
+
+async def seeded_engine(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    apply_sqlite_pragmas(engine, sqlite_pragmas())
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as db:
+        if not await db.scalar(select(func.count()).select_from(Laborer)):
+            db.add_all(Laborer(name=f"Worker {n}", age=30, gender="M", daily_wage=500,
+                               date_of_joining=date(2024, 1, 1)) for n in range(10))
+            await db.commit()
+    return engine, factory
+
+
+@pytest_asyncio.fixture
+async def file_session_factory(tmp_path):
+    engine, factory = await seeded_engine(tmp_path / "app.db")
+    yield factory
+    await engine.dispose()
+
+
+def mark(labour_id, day=1):
+    attendance = schemas.AttendanceBase(laborer_id=labour_id, laborer_name="", date=date(2024, 1, day),
+                                        present="present", hours_worked=8, site_name="North")
+    return lambda db: crud.write_attendance(db, labour_id, attendance)
+
+
+async def attendance_count(file_session_factory):
+    async with file_session_factory() as db:
+        return await db.scalar(select(func.count()).select_from(Attendance))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_one_commit(file_session_factory):
+    queue = WriteQueue(file_session_factory, max_batch=64, max_latency=0.05)
+
+    rows = await asyncio.gather(*(queue.submit(mark(n), "attendance") for n in range(1, 11)))
+
+    assert [row.laborer_id for row in rows] == list(range(1, 11))
+    assert all(row.id for row in rows)
+    assert queue.stats() == {"batches": 1, "writes": 10, "avg_batch": 10.0}
+    assert await attendance_count(file_session_factory) == 10
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_at_max_size(file_session_factory):
+    queue = WriteQueue(file_session_factory, max_batch=4, max_latency=0.05)
+
+    await asyncio.gather(*(queue.submit(mark(n), "attendance") for n in range(1, 11)))
+
+    assert queue.batches == 3
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_write_only_fails_its_caller(file_session_factory):
+    queue = WriteQueue(file_session_factory, max_latency=0.05)
+
+    async def rejected(db):
+        await crud.write_attendance(db, 1, schemas.AttendanceBase(
+            laborer_id=1, laborer_name="", date=date(2024, 1, 2), present="present",
+            hours_worked=8, site_name="North"))
+        raise HTTPException(status_code=404, detail="Laborer not found")
+
+    results = await asyncio.gather(
+        queue.submit(mark(1), "attendance"),
+        queue.submit(rejected, "attendance"),
+        queue.submit(mark(2), "attendance"),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[1], HTTPException)
+    assert [row.laborer_id for row in (results[0], results[2])] == [1, 2]
+    assert await attendance_count(file_session_factory) == 2  # The rejected write was rolled back on its own
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_commits_queued_writes(file_session_factory):
+    queue = WriteQueue(file_session_factory, max_latency=10)  # Would otherwise wait for a full batch
+
+    pending = [asyncio.ensure_future(queue.submit(mark(n), "attendance")) for n in range(1, 4)]
+    await asyncio.sleep(0.01)
+    await queue.stop()
+
+    assert len(await asyncio.gather(*pending)) == 3
+    assert await attendance_count(file_session_factory) == 3
+
+
+@pytest.mark.asyncio
+async def test_unexpected_error_fails_batch_and_writer_survives(file_session_factory, monkeypatch):
+    queue = WriteQueue(file_session_factory, max_latency=0.01)
+
+    def broken(*tables):
+        raise KeyError("attendance")
+    monkeypatch.setattr("backend.writes.invalidate_tables", broken)
+    with pytest.raises(KeyError):
+        await asyncio.wait_for(queue.submit(mark(1), "attendance"), 1)
+
+    monkeypatch.undo()
+    assert (await asyncio.wait_for(queue.submit(mark(2), "attendance"), 1)).laborer_id == 2
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_submit_after_stop_is_refused(file_session_factory):
+    queue = WriteQueue(file_session_factory, max_latency=0.01)
+    await queue.submit(mark(1), "attendance")
+    await queue.stop()
+
+    with pytest.raises(RuntimeError):
+        await queue.submit(mark(2), "attendance")
+    assert await attendance_count(file_session_factory) == 1
+
+
+def test_restarts_after_stop_in_a_new_event_loop(tmp_path):
+    # As the module-level queue does across two application lifespans
+    queue = WriteQueue(max_latency=0.01)
+
+    async def lifespan(day):
+        engine, queue.session_factory = await seeded_engine(tmp_path / "app.db")
+        queue.start()
+        try:
+            return await asyncio.wait_for(queue.submit(mark(1, day), "attendance"), 1)
+        finally:
+            await queue.stop()
+            await engine.dispose()
+
+    assert asyncio.run(lifespan(1)).date == date(2024, 1, 1)
+    assert asyncio.run(lifespan(2)).date == date(2024, 1, 2)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_writer_fails_waiting_callers(file_session_factory):
+    queue = WriteQueue(file_session_factory, max_latency=10)
+
+    pending = [asyncio.ensure_future(queue.submit(mark(n), "attendance")) for n in range(1, 4)]
+    await asyncio.sleep(0.01)
+    queue._task.cancel()
+
+    results = await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), 1)
+    assert all(isinstance(result, RuntimeError) for result in results)